@@ -10,7 +10,9 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # The window never needs these (numpy/pandas only back the optional CLI reports);
+    # leaving them out keeps the one-file unpack, and so cold start, small
+    excludes=['numpy', 'pandas', 'tkinter', 'unittest', 'pydoc', 'doctest'],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,346 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+# Never talk to a daemon the user has running
+os.environ["MINIGRIND_SOCKET"] = os.path.join(tempfile.mkdtemp(prefix="minigrind-bench-socket-"), "daemon.sock")
+
+from minigrind.budget import measure_core_import, measure_first_window  # noqa: E402
+from minigrind.export import task_rows, write_csv  # noqa: E402
+from minigrind.settings import load_settings, save_settings  # noqa: E402
+from minigrind.task import Task  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.25  # 25% slower than the baseline counts as a regression
+TASK_COUNTS = (10, 1000, 10000)
+EXPORT_ROWS = (100000, 1000000)
+QUICK_TASK_COUNTS = (10, 1000)
+QUICK_EXPORT_ROWS = (100000,)
+
+BENCHMARKS = []
+
+
+def benchmark(fn):
+    BENCHMARKS.append(fn)
+    return fn
+
+
+def median_time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+# --------------------- Qt helpers ---------------------
+_app = None
+
+
+def app():
+    global _app
+    if _app is None:
+        from PySide6.QtWidgets import QApplication
+        _app = QApplication.instance() or QApplication([])
+    return _app
+
+
+def window_with_tasks(count):
+    from minigrind.gui.window import TaskManager
+    app()
+    # Fresh working directory per window so journals/settings of earlier runs never leak in
+    os.chdir(tempfile.mkdtemp(prefix="minigrind-bench-"))
+    window = TaskManager()
+    for i in range(count):
+        window.task_model.add(f"task {i}")
+    window.show()
+    app().processEvents()
+    return window
+
+
+def close_window(window):
+    window.close()
+    app().processEvents()
+
+
+# --------------------- Benchmarks ---------------------
+@benchmark
+def task_operations(results, quick):
+    n = 20000 if quick else 200000
+    task = Task("bench")
+
+    def start_pause():
+        for _ in range(n):
+            task.start()
+            task.pause()
+
+    def elapsed():
+        task.start()
+        for _ in range(n):
+            task.get_elapsed()
+        task.pause()
+
+    results["task.start_pause"] = (median_time(start_pause, 3) / n * 1e6, "us")
+    results["task.get_elapsed"] = (median_time(elapsed, 3) / n * 1e6, "us")
+
+
+@benchmark
+def task_manager_operations(results, quick):
+    for count in QUICK_TASK_COUNTS if quick else TASK_COUNTS:
+        window = window_with_tasks(count)
+        model = window.task_filter
+        calls = 200
+
+        names = iter(f"added {i}" for i in range(10 * calls))
+
+        def add():
+            window.task_input.setText(next(names))
+            window.add_task()
+
+        rows = [(i * 7919) % count for i in range(calls)]
+        position = iter(rows * 10)
+
+        def start():
+            window.task_list.setCurrentIndex(model.index(next(position)))
+            window.start_task()
+
+        highlight_rows = iter(rows * 10)
+
+        def highlight():
+            window.task_list.setCurrentIndex(model.index(next(highlight_rows)))
+            window.update_task_highlight()
+
+        results[f"add_task[{count}]"] = (median_time(lambda: [add() for _ in range(calls)], 3) / calls * 1e6, "us")
+        results[f"start_task[{count}]"] = (median_time(lambda: [start() for _ in range(calls)], 3) / calls * 1e6, "us")
+        results[f"update_task_highlight[{count}]"] = (
+            median_time(lambda: [highlight() for _ in range(calls)], 3) / calls * 1e6, "us"
+        )
+
+        # Parallel timers: start and pause a scattered selection of up to 100 tasks in one go
+        from PySide6.QtCore import QItemSelection, QItemSelectionModel
+        selection = QItemSelection()
+        for row in range(0, count, max(1, count // 100)):
+            selection.select(model.index(row), model.index(row))
+        window.settings["parallel_timers"] = True
+        window.apply_parallel_timers()
+
+        def bulk_start_pause():
+            window.task_list.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+            window.start_task()
+            window.pause_task()
+
+        results[f"bulk_start_pause[{count}]"] = (median_time(bulk_start_pause, 5) * 1e3, "ms")
+        window.settings["parallel_timers"] = False
+        window.apply_parallel_timers()
+
+        # Type-ahead: one keystroke at a time, then clearing the box again
+        query = "task 123"
+
+        def type_ahead():
+            for i in range(1, len(query) + 1):
+                window.search_input.setText(query[:i])
+            window.search_input.clear()
+
+        results[f"type_ahead[{count}]"] = (median_time(type_ahead, 3) / (len(query) + 1) * 1e3, "ms")
+
+        themes = iter(["Dark", "Light"] * 20)
+
+        def switch_theme():
+            window.apply_theme(next(themes))
+            app().processEvents()
+
+        results[f"apply_theme[{count}]"] = (median_time(switch_theme, 5) * 1e3, "ms")
+        window.apply_theme("System")
+        close_window(window)
+
+
+@benchmark
+def mini_mode(results, quick):
+    window = window_with_tasks(100)
+    toggles = 20 if quick else 100
+
+    def toggle():
+        for _ in range(toggles):
+            window.toggle_mini_mode()
+            app().processEvents()
+
+    results["toggle_mini_mode"] = (median_time(toggle, 3) / toggles * 1e3, "ms")
+    close_window(window)
+
+
+@benchmark
+def export(results, quick):
+    folder = tempfile.mkdtemp(prefix="minigrind-bench-export-")
+    path = os.path.join(folder, "export.csv")
+    for rows in QUICK_EXPORT_ROWS if quick else EXPORT_ROWS:
+        def snapshot():
+            return ((f"task {i}", i, None) for i in range(rows))
+
+        results[f"export_csv.time[{rows}]"] = (median_time(lambda: write_csv(path, task_rows(snapshot())), 3) * 1e3, "ms")
+        tracemalloc.start()
+        write_csv(path, task_rows(snapshot()))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"export_csv.peak_memory[{rows}]"] = (peak / 2 ** 20, "MiB")
+        os.remove(path)
+
+    # End to end through the window: snapshot, worker thread and completion signal
+    window = window_with_tasks(1000 if quick else 10000)
+    window.show_message = lambda *args: None
+    window.settings["export_folder"] = folder
+
+    def export_window():
+        window.export_csv()
+        while window.export_job:
+            app().processEvents()
+
+    results["TaskManager.export_csv"] = (median_time(export_window, 3) * 1e3, "ms")
+    close_window(window)
+
+
+@benchmark
+def daemon(results, quick):
+    from minigrind.client import connect
+    folder = tempfile.mkdtemp(prefix="minigrind-bench-daemon-")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "minigrind", "daemon"], cwd=folder, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, PYTHONPATH=CODE_DIR)
+    )
+    try:
+        proc.stdout.readline()  # listening
+        client = connect()
+        client.call("add", task="bench")
+        n = 2000 if quick else 20000
+        requests = [{"op": "get", "task": "bench"}] * n
+
+        def round_trips():
+            for _ in range(n):
+                client.call("get", task="bench")
+
+        results["daemon.round_trip"] = (median_time(round_trips, 3) / n * 1e6, "us")
+        results["daemon.pipelined"] = (median_time(lambda: client.pipeline(requests), 3) / n * 1e6, "us")
+        results["daemon.batch"] = (median_time(lambda: client.batch(requests), 3) / n * 1e6, "us")
+        client.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+@benchmark
+def archive(results, quick):
+    # The same history read back through SQLite and through the archive's mapped day segments
+    from minigrind.archive import rebuild_archive
+    from minigrind.history import HistoryStore
+    from minigrind.reports import Archive, RollupEngine
+    os.chdir(tempfile.mkdtemp(prefix="minigrind-bench-archive-"))
+    history = HistoryStore()
+    n = 20000 if quick else 200000
+    first = time.time() - 3 * 365 * 86400
+    step = (time.time() - 86400 - first) / n
+    for i in range(n):
+        history.record_interval(f"task {i % 97}", first + i * step, first + i * step + step / 2)
+    history.flush()
+    results[f"archive.rebuild[{n}]"] = (median_time(lambda: rebuild_archive(history), 1) * 1e3, "ms")
+    archive = Archive()
+    results[f"rollup.from_history[{n}]"] = (median_time(lambda: RollupEngine.from_history(history), 3) * 1e3, "ms")
+    results[f"rollup.from_archive[{n}]"] = (median_time(lambda: RollupEngine.from_archive(archive), 3) * 1e3, "ms")
+    results[f"daily_totals.history[{n}]"] = (median_time(history.daily_totals, 3) * 1e3, "ms")
+    results[f"daily_totals.archive[{n}]"] = (median_time(archive.daily_totals, 3) * 1e3, "ms")
+    history.close()
+
+
+@benchmark
+def settings_and_startup(results, quick):
+    path = os.path.join(tempfile.mkdtemp(prefix="minigrind-bench-settings-"), "settings.json")
+    save_settings({"predefined_tasks": [f"task {i}" for i in range(10000)]}, path)
+    results["load_settings"] = (median_time(lambda: load_settings(path), 20) * 1e3, "ms")
+
+    repeat = 3 if quick else 5
+    results["startup.core_import"] = (statistics.median(measure_core_import()[0] for _ in range(repeat)), "ms")
+    windows = [measure_first_window() for _ in range(repeat)]
+    if all(w is not None for w in windows):
+        results["startup.first_window"] = (statistics.median(windows), "ms")
+
+
+# --------------------- Baseline ---------------------
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, entry in baseline.get("results", {}).items():
+        current = results.get(name)
+        if current is not None and current["value"] > entry["value"] * (1 + tolerance):
+            regressions.append((name, entry["value"], current["value"], current["unit"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MiniGrind benchmark suite (lower is better everywhere)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast sanity run")
+    parser.add_argument("--only", action="append", metavar="NAME", help="run only these benchmark groups")
+    parser.add_argument("--output", metavar="PATH", help="write results as JSON to this file")
+    parser.add_argument("--baseline", metavar="PATH", default=BASELINE_FILE, help="baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a result is flagged (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    raw = {}
+    for bench in BENCHMARKS:
+        if args.only and bench.__name__ not in args.only:
+            continue
+        print(f"running {bench.__name__}...", file=sys.stderr)
+        bench(raw, args.quick)
+    os.chdir(cwd)
+
+    results = {name: {"value": round(value, 4), "unit": unit} for name, (value, unit) in raw.items()}
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": results,
+    }
+    for name, entry in results.items():
+        print(f"{name:40s} {entry['value']:12.3f} {entry['unit']}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare against (run with --save-baseline first)", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("quick") != args.quick:
+        print("baseline was recorded with a different --quick setting; sizes differ", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, before, after, unit in regressions:
+        print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} {unit} (+{(after / before - 1) * 100:.0f}%)",
+              file=sys.stderr)
+    if not regressions:
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
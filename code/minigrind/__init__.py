@@ -0,0 +1,9 @@
+# Core of MiniGrind. Nothing imported here may pull in Qt; the GUI lives in minigrind.gui
+from .constants import VERSION_NUMBER, WEEKDAYS
+from .export import CSV_HEADER, export_path, history_rows, task_rows, write_csv
+from .history import HistoryStore
+from .journal import Journal, JournalState
+from .search import NameIndex
+from .settings import DEFAULT_SETTINGS, SETTINGS_FILE, SettingsStore, load_settings, save_settings
+from .store import TaskStore
+from .task import Task, format_seconds, format_task_date
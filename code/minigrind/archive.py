@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import date, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: one MiniGrind process per archive
+    fcntl = None
+
+from .intervals import split_by_day
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_FLUSH_INTERVAL = 1.0  # seconds of closed intervals grouped into one write per segment
+NAMES_FILE = "names.jsonl"
+SEALED_FILE = "sealed"  # the last day rebuilt from the history; later segments may be partial
+SEGMENT_SUFFIX = ".bin"
+
+
+# --------------------- Format ---------------------
+# One segment per day, YYYY-MM-DD.bin: packed little-endian records of task id (uint32),
+# start, stop and seconds (float64), 28 bytes each, the same layout as reports.RECORD so
+# numpy maps a segment as it is. Task ids index names.jsonl, one JSON string per line.
+# Segments are only ever appended to, or replaced whole by a rebuild.
+RECORD = struct.Struct("<Iddd")
+
+
+def segment_path(folder, day):
+    return os.path.join(folder, day + SEGMENT_SUFFIX)
+
+
+def segment_days(folder, first_day=None, last_day=None):
+    # Sorted days that have a segment; ISO days sort like the dates they name
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return []
+    days = sorted(name[:-len(SEGMENT_SUFFIX)] for name in names if name.endswith(SEGMENT_SUFFIX))
+    return [day for day in days
+            if (first_day is None or day >= first_day) and (last_day is None or day <= last_day)]
+
+
+def read_names(folder):
+    try:
+        with open(os.path.join(folder, NAMES_FILE), "rb") as f:
+            return [json.loads(line) for line in f if line.endswith(b"\n")]
+    except FileNotFoundError:
+        return []
+
+
+def sealed_day(folder):
+    try:
+        with open(os.path.join(folder, SEALED_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# --------------------- Name Table ---------------------
+class NameTable:
+    # Task name -> id, shared by every process writing the archive: a new name is appended
+    # under a lock after reading what the others added since.
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, NAMES_FILE)
+        self.names = []
+        self._ids = {}
+        self._offset = 0
+
+    def id(self, name):
+        task_id = self._ids.get(name)
+        if task_id is not None:
+            return task_id
+        with open(self.path, "ab+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            self._read_new(f)
+            task_id = self._ids.get(name)
+            if task_id is None:
+                line = json.dumps(name).encode() + b"\n"
+                f.write(line)
+                f.flush()
+                self._add(name)
+                self._offset += len(line)
+                task_id = self._ids[name]
+        return task_id
+
+    def _read_new(self, f):
+        f.seek(self._offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            self._offset += len(line)
+            self._add(json.loads(line))
+
+    def _add(self, name):
+        self._ids.setdefault(name, len(self.names))
+        self.names.append(name)
+
+
+# --------------------- Archive Writer ---------------------
+class ArchiveWriter:
+    # TaskStore observer: appends every closed interval to the segment of its day(s)
+    # from a writer thread, like the history store.
+    def __init__(self, folder=ARCHIVE_DIR):
+        self.folder = folder
+        self.names = NameTable(folder)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+
+    def interval_closed(self, task, start, stop):
+        if stop > start:
+            self._queue.put((task.name, start, stop))
+
+    def flush(self):
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + ARCHIVE_FLUSH_INTERVAL
+            while isinstance(batch[-1], tuple):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            closing = batch[-1] is None
+            try:
+                self._write([item for item in batch if isinstance(item, tuple)])
+            except OSError as e:
+                # The history store still has them; `minigrind archive` fills the gap
+                log.error("Could not write the archive: %s", e)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, batch):
+        segments = {}
+        for name, start, stop in batch:
+            task_id = self.names.id(name)
+            for day, s, e in split_by_day(start, stop):
+                segments.setdefault(day, []).append(RECORD.pack(task_id, s, e, e - s))
+        for day, records in segments.items():
+            # One append per segment; records are whole, so readers never see half of one
+            fd = os.open(segment_path(self.folder, day), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b"".join(records))
+            finally:
+                os.close(fd)
+
+
+def archive_writer(settings):
+    # The writer when the archive is switched on in the settings, else None
+    return ArchiveWriter() if settings.get("columnar_archive") else None
+
+
+# --------------------- Rebuild ---------------------
+def rebuild_archive(history, folder=ARCHIVE_DIR, first_day=None, last_day=None):
+    # Brings the segments of the range in line with the history store: a day is rewritten
+    # (atomically) only when its records differ, days the history no longer has are removed.
+    # Returns the number of segments written or removed.
+    names = NameTable(folder)
+    days = {}
+    for name, start, stop in history.intervals(first_day, last_day):
+        task_id = names.id(name)
+        for day, s, e in split_by_day(start, stop):
+            days.setdefault(day, []).append(RECORD.pack(task_id, s, e, e - s))
+    changed = 0
+    for day, records in days.items():
+        data = b"".join(records)
+        path = segment_path(folder, day)
+        try:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    continue
+        except FileNotFoundError:
+            pass
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        changed += 1
+    for day in segment_days(folder, first_day, last_day):
+        if day not in days:
+            os.remove(segment_path(folder, day))
+            changed += 1
+    return changed
+
+
+def seal_archive(history, folder=ARCHIVE_DIR):
+    # Rebuilds the days after the sealed one up to yesterday from the history and seals them:
+    # the writer only records what closed while the archive was on and a process had it open,
+    # so only rebuilt days are known to be complete. The first call backfills everything.
+    # Returns the sealed day, None when there is nothing before today.
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    sealed = sealed_day(folder)
+    if sealed is not None and sealed >= yesterday:
+        return sealed
+    first_day = None if sealed is None else (date.fromisoformat(sealed) + timedelta(days=1)).isoformat()
+    rebuild_archive(history, folder, first_day, yesterday)
+    path = os.path.join(folder, SEALED_FILE)
+    with open(path + ".tmp", "w") as f:
+        f.write(yesterday + "\n")
+    os.replace(path + ".tmp", path)
+    return yesterday
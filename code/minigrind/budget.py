@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CORE_IMPORT_BUDGET_MS = 100
+FIRST_WINDOW_BUDGET_MS = 2000
+FIRST_WINDOW_ENV = "MINIGRIND_FIRST_WINDOW_EXIT"
+FIRST_WINDOW_MARKER = "minigrind: first window"
+HEAVY_MODULES = ("PySide6", "shiboken6", "numpy", "pandas")
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CORE_PROBE = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    "import minigrind, minigrind.cli\n"
+    "print((time.perf_counter() - t) * 1000)\n"
+    "print(','.join(sorted({m.split('.')[0] for m in sys.modules} & set(sys.argv[1:]))) or '-')\n"
+)
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (PACKAGE_ROOT, env.get("PYTHONPATH")) if p)
+    return env
+
+
+# --------------------- Measurements ---------------------
+def measure_core_import():
+    # Fresh interpreter so nothing is already cached in sys.modules
+    result = subprocess.run(
+        [sys.executable, "-c", _CORE_PROBE, *HEAVY_MODULES],
+        capture_output=True, text=True, check=True, env=_env()
+    )
+    elapsed, heavy = result.stdout.split()
+    return float(elapsed), [] if heavy == "-" else heavy.split(",")
+
+
+def measure_first_window(timeout=60):
+    env = _env()
+    env[FIRST_WINDOW_ENV] = "1"
+    # Throwaway working directory so the run doesn't touch real settings or journal
+    with tempfile.TemporaryDirectory() as cwd:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "minigrind", "gui"],
+            cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        elapsed = None
+        try:
+            for line in proc.stdout:
+                if line.strip() == FIRST_WINDOW_MARKER:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    break
+            proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    return elapsed
+
+
+# --------------------- Budget check ---------------------
+def check_budgets(gui=True, out=sys.stdout):
+    ok = True
+
+    elapsed, heavy = measure_core_import()
+    within = elapsed <= CORE_IMPORT_BUDGET_MS
+    ok &= within
+    print(f"core import: {elapsed:.1f} ms (budget {CORE_IMPORT_BUDGET_MS} ms) {'ok' if within else 'OVER'}", file=out)
+    ok &= not heavy
+    print(f"core imports without GUI/heavy modules: {'ok' if not heavy else 'FAIL (' + ', '.join(heavy) + ')'}", file=out)
+
+    if gui:
+        elapsed = measure_first_window()
+        if elapsed is None:
+            ok = False
+            print("first window: FAIL (window never came up)", file=out)
+        else:
+            within = elapsed <= FIRST_WINDOW_BUDGET_MS
+            ok &= within
+            print(f"first window: {elapsed:.0f} ms (budget {FIRST_WINDOW_BUDGET_MS} ms) {'ok' if within else 'OVER'}", file=out)
+
+    return 0 if ok else 1
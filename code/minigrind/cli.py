@@ -0,0 +1,332 @@
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from .archive import archive_writer
+from .client import DaemonError, RemoteStore, connect
+from .constants import MAX_LOGGED_MINUTES, REPORT_KINDS, VERSION_NUMBER
+from .export import export_path, export_pipeline, history_rows, task_rows, write_csv
+from .history import HistoryStore
+from .journal import Journal
+from .settings import load_settings
+from .store import TaskStore
+from .task import format_seconds
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="minigrind", description="MiniGrind task timer")
+    parser.add_argument("--version", action="version", version=f"MiniGrind {VERSION_NUMBER}")
+    sub = parser.add_subparsers(dest="command", metavar="command")
+
+    sub.add_parser("gui", help="open the MiniGrind window (default)")
+    sub.add_parser("daemon", help="keep the tasks in a background process that windows and commands share")
+    sub.add_parser("status", help="list today's tasks and their time")
+
+    p = sub.add_parser("sessions", help="list today's sessions, or those within a time range")
+    p.add_argument("--from", dest="first", type=clock_time, metavar="HH:MM", help="from this time today")
+    p.add_argument("--to", dest="last", type=clock_time, metavar="HH:MM", help="up to this time today")
+
+    p = sub.add_parser("add", help="add a task")
+    p.add_argument("name")
+
+    p = sub.add_parser("start", help="start or resume tasks, adding them when needed")
+    p.add_argument("names", nargs="+", metavar="name", help="several only run together with parallel timers on")
+
+    p = sub.add_parser("pause", help="pause the running task")
+    p.add_argument("name", nargs="?", help="this task instead of the one started last")
+    p.add_argument("--all", action="store_true", help="every running task")
+
+    p = sub.add_parser("remove", help="remove a task")
+    p.add_argument("name")
+
+    p = sub.add_parser("log", help="add a task afterwards with the minutes spent on it")
+    p.add_argument("name")
+    p.add_argument("minutes", type=int)
+
+    p = sub.add_parser("export", help="export today's tasks, or a range of history, to CSV")
+    p.add_argument("--folder", help="export folder (default: the one from settings)")
+    add_range_arguments(p)
+
+    p = sub.add_parser("history", help="show tracked time from the history store")
+    p.add_argument("--task", help="only this task")
+    p.add_argument("--by", choices=["task", "day"], default="task", help="group totals per task or per day")
+    add_range_arguments(p)
+
+    p = sub.add_parser("report", help="rollups over the history: totals, weekly, monthly, weekdays, streaks")
+    p.add_argument("kind", choices=REPORT_KINDS)
+    p.add_argument("--csv", metavar="PATH", help="write the summary to a CSV file instead of printing it")
+    add_range_arguments(p)
+
+    p = sub.add_parser("import", help="import earlier CSV exports into the history")
+    p.add_argument("folder", nargs="?", help="folder with the exports (default: the export folder from settings)")
+    p.add_argument("--workers", type=int, help="parser processes (default: one per CPU)")
+
+    p = sub.add_parser("archive", help="bring the columnar archive up to date with the history")
+    add_range_arguments(p)
+
+    p = sub.add_parser("budget", help="check import and startup time against their budgets")
+    p.add_argument("--no-gui", action="store_true", help="skip the time-to-first-window check")
+    return parser
+
+
+def clock_time(text):
+    # HH:MM today as a timestamp
+    try:
+        clock = datetime.strptime(text, "%H:%M").time()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HH:MM, not {text!r}")
+    return datetime.combine(datetime.now().date(), clock).timestamp()
+
+
+def add_range_arguments(parser):
+    parser.add_argument("--from", dest="first_day", metavar="YYYY-MM-DD", help="first day (inclusive)")
+    parser.add_argument("--to", dest="last_day", metavar="YYYY-MM-DD", help="last day (inclusive)")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command in (None, "gui"):
+        # Qt is only imported once we know a window is wanted
+        from .gui import run
+        return run()
+    if args.command == "budget":
+        from .budget import check_budgets
+        return check_budgets(gui=not args.no_gui)
+    if args.command == "daemon":
+        from .daemon import run
+        try:
+            return run()
+        except RuntimeError as e:
+            return fail(str(e))
+
+    settings = load_settings()
+    client = connect()
+    if client:
+        return run_remote(client, settings, args)
+    journal = Journal()
+    history = HistoryStore()
+    archive = archive_writer(settings)
+    sinks = export_pipeline(settings)
+    try:
+        store = TaskStore(journal, observers=[observer for observer in (history, archive, sinks) if observer],
+                          parallel=settings.get("parallel_timers", False))
+        if not store.restore() and settings.get("auto_load_predefined", True):
+            store.reset(settings.get("predefined_tasks", []))
+        return COMMANDS[args.command](store, history, settings, args)
+    finally:
+        journal.close()
+        history.close()
+        if archive:
+            archive.close()
+        if sinks:
+            # What does not get through in time stays in the outbox for the next run
+            sinks.close()
+
+
+def run_remote(client, settings, args):
+    # The daemon owns the tasks; history queries read the database it writes
+    history = HistoryStore()
+    try:
+        client.call("flush")
+        return COMMANDS[args.command](RemoteStore(client), history, settings, args)
+    except DaemonError as e:
+        return fail(str(e))
+    finally:
+        client.close()
+        history.close()
+
+
+def fail(message):
+    print(message, file=sys.stderr)
+    return 1
+
+
+def history_source(history, settings):
+    # With the columnar archive switched on (and numpy there to read it), finished days come
+    # from its day segments and the rest from the database; days since the last query are
+    # rebuilt from the history first, so a late or partial archive never shows
+    if settings.get("columnar_archive"):
+        try:
+            from .reports import Archive, ArchivedHistory
+        except ImportError:
+            return history
+        from .archive import seal_archive
+        try:
+            sealed = seal_archive(history)
+        except OSError as e:
+            print(f"Archive not used, could not bring it up to date: {e}", file=sys.stderr)
+            return history
+        return ArchivedHistory(Archive(), history, sealed)
+    return history
+
+
+# --------------------- Commands ---------------------
+def cmd_status(store, history, settings, args):
+    if not len(store):
+        print("No tasks")
+    for task in store:
+        marker = "*" if task.running else " "
+        print(f"{marker} {task.get_time_str()}  {task.name}")
+    return 0
+
+
+def cmd_sessions(store, history, settings, args):
+    # Straight from the store's interval index, so only the sessions in the range are looked at
+    today = datetime.now().date()
+    first = args.first if args.first is not None else datetime.combine(today, datetime.min.time()).timestamp()
+    last = args.last if args.last is not None else datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+    sessions = sorted(store.sessions_between(first, last), key=lambda session: session[1])
+    if not sessions:
+        print("No sessions")
+    for task, start, stop in sessions:
+        span = f"{datetime.fromtimestamp(start):%H:%M:%S}-{datetime.fromtimestamp(stop):%H:%M:%S}"
+        print(f"{span}  {format_seconds(int(stop - start))}  {task.name}")
+    return 0
+
+
+def cmd_add(store, history, settings, args):
+    if not store.add(args.name):
+        return fail("A task with this name already exists.")
+    return 0
+
+
+def cmd_start(store, history, settings, args):
+    names = list(dict.fromkeys(args.names))
+    # The store's mode, not settings.json: a daemon keeps the one it started with
+    if len(names) > 1 and not store.parallel:
+        return fail("Only one task can run at a time; turn on parallel timers to start several.")
+    tasks = [store.get(name) or store.add(name) for name in names]
+    for task in store.start_many(tasks):
+        print(f"Running task: {task.name}")
+    return 0
+
+
+def cmd_pause(store, history, settings, args):
+    if args.all:
+        tasks = store.pause_many()
+    elif args.name:
+        task = store.get(args.name)
+        tasks = [task] if task and store.pause_task(task) else []
+    else:
+        tasks = [task for task in [store.pause()] if task]
+    if not tasks:
+        return fail("No task running")
+    for task in tasks:
+        print(f"Paused {task.name} at {task.get_time_str()}")
+    return 0
+
+
+def cmd_remove(store, history, settings, args):
+    task = store.get(args.name)
+    if not task:
+        return fail(f"No task named '{args.name}'")
+    store.remove(task)
+    return 0
+
+
+def cmd_log(store, history, settings, args):
+    if not 0 < args.minutes <= MAX_LOGGED_MINUTES:
+        return fail(f"Please enter between 1 and {MAX_LOGGED_MINUTES} minutes.")
+    if not store.add(args.name, args.minutes * 60):
+        return fail("A task with this name already exists.")
+    print(f"Added task '{args.name}' with {args.minutes} minutes logged.")
+    return 0
+
+
+def cmd_export(store, history, settings, args):
+    if args.first_day or args.last_day:
+        history.flush()
+        rows = history_rows(history_source(history, settings).daily_totals(args.first_day, args.last_day))
+    elif len(store):
+        rows = task_rows(store.snapshot())
+    else:
+        return fail("Er zijn geen taken om te exporteren.")
+    if args.folder:
+        settings = dict(settings, export_folder=args.folder)
+    path = export_path(settings)
+    try:
+        write_csv(path, rows)
+    except OSError as e:
+        return fail(f"Kon CSV niet opslaan:\n{e}")
+    print(f"CSV opgeslagen als:\n{path}")
+    return 0
+
+
+def cmd_history(store, history, settings, args):
+    # Pick up the interval this very command may have closed
+    history.flush()
+    source = history_source(history, settings)
+    if args.by == "day":
+        rows = source.totals_by_day(args.first_day, args.last_day, args.task)
+    elif args.task:
+        rows = [(args.task, source.task_total(args.task, args.first_day, args.last_day))]
+    else:
+        rows = source.totals_by_task(args.first_day, args.last_day)
+    for label, seconds in rows:
+        print(f"{format_seconds(int(seconds))}  {label}")
+    return 0
+
+
+def cmd_report(store, history, settings, args):
+    try:
+        from .reports import ArchivedHistory, RollupEngine, export_report, format_report
+    except ImportError:
+        return fail("Reports need numpy and pandas: pip install -r requirements.txt")
+    history.flush()
+    source = history_source(history, settings)
+    if isinstance(source, ArchivedHistory):
+        engine = RollupEngine.from_archived_history(source, args.first_day, args.last_day)
+    else:
+        engine = RollupEngine.from_history(history, args.first_day, args.last_day)
+    frame = engine.report(args.kind, args.first_day, args.last_day)
+    if args.csv:
+        try:
+            export_report(frame, args.csv)
+        except OSError as e:
+            return fail(f"Kon CSV niet opslaan:\n{e}")
+        print(f"CSV opgeslagen als:\n{args.csv}")
+    else:
+        print(format_report(frame).to_string())
+    return 0
+
+
+def cmd_import(store, history, settings, args):
+    from .importer import import_exports
+    folder = args.folder or settings.get("export_folder") or "."
+    if not os.path.isdir(folder):
+        return fail(f"No folder named '{folder}'")
+    history.flush()
+    files, days = import_exports(folder, history, workers=args.workers)
+    print(f"Read {files} new export(s), imported {days} day(s) from {folder}")
+    if days and settings.get("columnar_archive"):
+        cmd_archive(store, history, settings, argparse.Namespace(first_day=None, last_day=None))
+    return 0
+
+
+def cmd_archive(store, history, settings, args):
+    from .archive import rebuild_archive
+    history.flush()
+    try:
+        changed = rebuild_archive(history, first_day=args.first_day, last_day=args.last_day)
+    except OSError as e:
+        return fail(f"Kon archief niet schrijven:\n{e}")
+    print(f"Archive up to date, {changed} day(s) written or removed")
+    return 0
+
+
+COMMANDS = {
+    "status": cmd_status,
+    "sessions": cmd_sessions,
+    "add": cmd_add,
+    "start": cmd_start,
+    "pause": cmd_pause,
+    "remove": cmd_remove,
+    "log": cmd_log,
+    "export": cmd_export,
+    "history": cmd_history,
+    "report": cmd_report,
+    "import": cmd_import,
+    "archive": cmd_archive,
+}
@@ -0,0 +1,202 @@
+import json
+import os
+import select
+import socket
+from collections import deque
+
+from .task import Task
+
+SOCKET_ENV = "MINIGRIND_SOCKET"
+CONNECT_TIMEOUT = 0.5  # seconds; a live daemon answers well within this
+RECV_BYTES = 1 << 16
+
+
+# --------------------- Protocol ---------------------
+# One JSON object per line in both directions. Requests carry an id that comes back in the
+# response ({"id", "result"} or {"id", "error"}); requests may be pipelined and are answered
+# in order. Subscribers also receive {"event", "task"} lines for every change, whoever made it.
+def socket_path():
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    folder = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    return os.path.join(folder, f"minigrind-{os.getuid()}.sock")
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def task_state(task):
+    last = [task.starts[-1], task.stops[-1]] if task.stops else None
+    return {"name": task.name, "total": task.total_seconds, "start": task.start_time, "last": last}
+
+
+def task_from_state(state):
+    task = Task(state["name"])
+    task.total_seconds = state["total"]
+    task.start_time = state["start"]
+    return task
+
+
+# --------------------- Client ---------------------
+class DaemonError(Exception):
+    pass
+
+
+class Client:
+    def __init__(self, path=None):
+        self.path = path or socket_path()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            self.sock.connect(self.path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.settimeout(None)
+        self._pending = b""
+        self._messages = deque()
+        self._next_id = 0
+        self.events = deque()  # events received while waiting for responses
+
+    def close(self):
+        self.sock.close()
+
+    def call(self, op, **params):
+        return self.pipeline([dict(params, op=op)])[0]
+
+    def batch(self, requests):
+        # Runs as one unit on the daemon: no other client's request lands in between
+        return self.call("batch", ops=requests)
+
+    def pipeline(self, requests):
+        # Sends everything without waiting for answers: one round trip for the lot. Answers
+        # are read while sending, or a long pipeline would fill both socket buffers and stall.
+        ids = []
+        lines = []
+        for request in requests:
+            self._next_id += 1
+            ids.append(self._next_id)
+            lines.append(encode(dict(request, id=self._next_id)))
+        out = memoryview(b"".join(lines))
+        responses = {}
+        while len(responses) < len(ids):
+            if out and not self._messages:
+                readable, writable, _ = select.select([self.sock], [self.sock], [])
+                if writable:
+                    try:
+                        out = out[self.sock.send(out, socket.MSG_DONTWAIT):]
+                    except BlockingIOError:
+                        pass
+                if not readable:
+                    continue
+            message = self._read()
+            if "event" in message:
+                self.events.append(message)
+            else:
+                responses[message.get("id")] = message
+        results = []
+        for request_id in ids:
+            response = responses[request_id]
+            if "error" in response:
+                raise DaemonError(response["error"])
+            results.append(response.get("result"))
+        return results
+
+    def next_event(self):
+        return self.events.popleft() if self.events else self._read()
+
+    def _read(self):
+        while not self._messages:
+            data = self.sock.recv(RECV_BYTES)
+            if not data:
+                raise DaemonError("The daemon closed the connection")
+            lines = (self._pending + data).split(b"\n")
+            self._pending = lines.pop()
+            self._messages.extend(lines)
+        return json.loads(self._messages.popleft())
+
+
+def connect(path=None):
+    # A Client for the running daemon, or None when there is none
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        return Client(path)
+    except OSError:
+        return None
+
+
+# --------------------- Remote Task Store ---------------------
+class RemoteStore:
+    # The part of TaskStore the command line uses, served by the daemon. Tasks are copies
+    # of the daemon's state at the time of the call.
+    def __init__(self, client):
+        self.client = client
+        self._tasks = None
+
+    def __len__(self):
+        return len(self._list())
+
+    def __iter__(self):
+        return iter(self._list())
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def _list(self):
+        if self._tasks is None:
+            self._tasks = [task_from_state(state) for state in self.client.call("list")]
+        return self._tasks
+
+    def _changed(self, state):
+        self._tasks = None
+        return task_from_state(state) if state else None
+
+    def get(self, name):
+        state = self.client.call("get", task=name)
+        return task_from_state(state) if state else None
+
+    def add(self, name, total_seconds=0):
+        try:
+            return self._changed(self.client.call("add", task=name, total=total_seconds))
+        except DaemonError:
+            return None
+
+    def start(self, task):
+        return self._changed(self.client.call("start", task=task.name))
+
+    @property
+    def parallel(self):
+        return self.client.call("mode")["parallel"]
+
+    def start_many(self, tasks):
+        # The daemon decides whether they may run together; returns the tasks running after
+        self._tasks = None
+        return [task_from_state(state) for state in self.client.call("start_many", tasks=[task.name for task in tasks])]
+
+    def pause(self):
+        return self._changed(self.client.call("pause"))
+
+    def pause_task(self, task):
+        # Pausing changes the daemon's copy; `task` gets its new state
+        state = self.client.call("pause", task=task.name)
+        self._tasks = None
+        if state:
+            task.total_seconds, task.start_time = state["total"], state["start"]
+        return state is not None
+
+    def pause_many(self):
+        self._tasks = None
+        return [task_from_state(state) for state in self.client.call("pause_all")]
+
+    def remove(self, task):
+        self._tasks = None
+        return self.client.call("remove", task=task.name)
+
+    def sessions_between(self, first, last):
+        return [(Task(name), start, stop) for name, start, stop in self.client.call("sessions", first=first, last=last)]
+
+    def snapshot(self):
+        return [tuple(row) for row in self.client.call("snapshot")]
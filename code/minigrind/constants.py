@@ -0,0 +1,5 @@
+VERSION_NUMBER = "0.0.4_beta"
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday",
+            "friday", "saturday", "sunday"]
+REPORT_KINDS = ("totals", "weekly", "monthly", "weekdays", "streaks")
+MAX_LOGGED_MINUTES = 10000  # most time logged afterwards in one go, about a week
@@ -0,0 +1,336 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import signal
+import socket
+
+from .archive import archive_writer
+from .client import encode, socket_path, task_state
+from .constants import MAX_LOGGED_MINUTES, VERSION_NUMBER
+from .export import export_pipeline
+from .history import HistoryStore
+from .journal import Journal
+from .settings import load_settings
+from .store import TaskStore
+
+log = logging.getLogger(__name__)
+
+MAX_REQUEST_BYTES = 1 << 20       # longest request line, batches included
+READ_CHUNK_BYTES = 1 << 16
+WRITE_HIGH_WATER = 1 << 16        # buffered response bytes before a connection waits for its client
+SUBSCRIBER_MAX_BUFFER = 1 << 22   # a subscriber this far behind is disconnected
+
+
+class RequestError(Exception):
+    pass
+
+
+# --------------------- Timer Service ---------------------
+class TimerService:
+    # Runs requests against the one TaskStore; every request completes before the next
+    # starts, so a batch is atomic for free. Also a TaskStore observer that pushes each
+    # change to the subscribed connections.
+    def __init__(self, store, history=None, archive=None):
+        self.store = store
+        self.history = history
+        self.archive = archive
+        self.subscribers = set()
+        store.observers.append(self)
+        self.ops = {
+            "ping": self.op_ping,
+            "mode": self.op_mode,
+            "state": self.op_state,
+            "list": self.op_list,
+            "get": self.op_get,
+            "add": self.op_add,
+            "start": self.op_start,
+            "start_many": self.op_start_many,
+            "pause": self.op_pause,
+            "pause_all": self.op_pause_all,
+            "log": self.op_log,
+            "remove": self.op_remove,
+            "snapshot": self.op_snapshot,
+            "at": self.op_at,
+            "sessions": self.op_sessions,
+            "flush": self.op_flush,
+            "batch": self.op_batch,
+        }
+
+    def handle_line(self, line, connection):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return encode({"id": None, "error": "invalid JSON"})
+        if not isinstance(request, dict):
+            return encode({"id": None, "error": "expected a JSON object"})
+        return encode(self.execute(request, connection))
+
+    def execute(self, request, connection=None):
+        response = {"id": request.get("id")}
+        op = request.get("op")
+        try:
+            if op == "subscribe":
+                self.subscribers.add(connection)
+                response["result"] = True
+            elif op == "unsubscribe":
+                self.subscribers.discard(connection)
+                response["result"] = True
+            elif op in self.ops:
+                response["result"] = self.ops[op](request)
+            else:
+                raise RequestError(f"unknown op {op!r}")
+        except (RequestError, KeyError, TypeError, ValueError, OverflowError) as e:
+            response["error"] = str(e) if isinstance(e, RequestError) else f"bad request: {e!r}"
+        return response
+
+    def _name(self, request):
+        # New tasks end up in the journal and the history, which only take real names
+        name = request["task"]
+        if not isinstance(name, str) or not name.strip():
+            raise RequestError("task must be a non-empty string")
+        return name
+
+    def _seconds(self, request, key, default=None):
+        # JSON lets Infinity and NaN through; neither is a duration the journal or the history
+        # can take, nor is anything beyond what the window lets one log
+        seconds = request[key] if default is None else request.get(key, default)
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not math.isfinite(seconds):
+            raise RequestError(f"{key} must be a finite number")
+        if not 0 <= seconds <= MAX_LOGGED_MINUTES * 60:
+            raise RequestError(f"{key} must be between 0 and {MAX_LOGGED_MINUTES * 60} seconds")
+        return seconds
+
+    def _task(self, request):
+        task = self.store.get(request["task"])
+        if task is None:
+            raise RequestError(f"no task named {request['task']!r}")
+        return task
+
+    # ----------------- Ops -----------------
+    def op_ping(self, request):
+        return VERSION_NUMBER
+
+    def op_mode(self, request):
+        # Read from the settings once, at startup; clients ask rather than read them again
+        return {"parallel": self.store.parallel}
+
+    def op_state(self, request):
+        # Same shape as the journal's state: name -> [total, start, sessions]
+        return {task.name: [task.total_seconds, task.start_time, task.intervals()] for task in self.store}
+
+    def op_list(self, request):
+        return [task_state(task) for task in self.store]
+
+    def op_get(self, request):
+        task = self.store.get(request["task"])
+        return task_state(task) if task else None
+
+    def op_add(self, request):
+        task = self.store.add(self._name(request), self._seconds(request, "total", 0))
+        if task is None:
+            raise RequestError("A task with this name already exists.")
+        return task_state(task)
+
+    def op_start(self, request):
+        name = self._name(request)
+        task = self.store.get(name)
+        if task is None:
+            if not request.get("create", True):
+                raise RequestError(f"no task named {name!r}")
+            task = self.store.add(name)
+        self.store.start(task)
+        return task_state(task)
+
+    def op_start_many(self, request):
+        # Several tasks only when parallel timers are on here, or all but the last would get
+        # a session of no time at all. Answers with the tasks that run afterwards.
+        names = request["tasks"]
+        if not isinstance(names, list) or not names:
+            raise RequestError("tasks must be a list of task names")
+        names = list(dict.fromkeys(self._name({"task": name}) for name in names))
+        if len(names) > 1 and not self.store.parallel:
+            raise RequestError("The daemon runs without parallel timers; start one task at a time.")
+        tasks = [self.store.get(name) or self.store.add(name) for name in names]
+        self.store.start_many(tasks)
+        return [task_state(task) for task in self.store.running.values()]
+
+    def op_pause(self, request):
+        # The named task, or the one started last; None when it was not running
+        if "task" not in request:
+            task = self.store.pause()
+            return task_state(task) if task else None
+        task = self.store.get(request["task"])
+        if task is None or not self.store.pause_task(task):
+            return None
+        return task_state(task)
+
+    def op_pause_all(self, request):
+        return [task_state(task) for task in self.store.pause_many()]
+
+    def op_log(self, request):
+        seconds = self._seconds(request, "seconds")
+        if not seconds:
+            raise RequestError("seconds must be a positive number")
+        task = self._task(request)
+        self.store.log_time([task], seconds)
+        return task_state(task)
+
+    def op_remove(self, request):
+        return self.store.remove(self._task(request))
+
+    def op_snapshot(self, request):
+        return self.store.snapshot()
+
+    def op_at(self, request):
+        return [task.name for task in self.store.tasks_at(request["t"])]
+
+    def op_sessions(self, request):
+        # [name, start, stop] of the sessions overlapping [first, last); running ones end now
+        first, last = request["first"], request["last"]
+        if not all(isinstance(t, (int, float)) and math.isfinite(t) for t in (first, last)):
+            raise RequestError("first and last must be timestamps")
+        return [[task.name, start, stop] for task, start, stop in self.store.sessions_between(first, last)]
+
+    def op_flush(self, request):
+        # False when the journal or the history could not write everything yet
+        flushed = True
+        if self.store.journal:
+            flushed = self.store.journal.flush() and flushed
+        if self.history:
+            flushed = self.history.flush() and flushed
+        if self.archive:
+            self.archive.flush()
+        return flushed
+
+    def op_batch(self, request):
+        ops = request["ops"]
+        if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+            raise RequestError("ops must be a list of requests")
+        # Subscribing needs the connection, which the ops of a batch do not carry
+        if any(op.get("op") in ("subscribe", "unsubscribe") for op in ops):
+            raise RequestError("subscribe and unsubscribe cannot be batched")
+        return [self.execute(op) for op in ops]
+
+    # ----------------- Notifications (TaskStore observer) -----------------
+    def task_added(self, task):
+        self.publish("task_added", task)
+
+    def task_removed(self, task):
+        self.publish("task_removed", task)
+
+    def task_started(self, task):
+        self.publish("task_started", task)
+
+    def task_paused(self, task):
+        self.publish("task_paused", task)
+
+    def task_logged(self, task):
+        self.publish("task_logged", task)
+
+    def publish(self, event, task):
+        if not self.subscribers:
+            return
+        line = encode({"event": event, "task": task_state(task)})
+        for connection in list(self.subscribers):
+            if connection is None or connection.is_closing():
+                # Gone already; handle() forgets it too, this covers what slipped past
+                self.subscribers.discard(connection)
+            elif connection.transport.get_write_buffer_size() > SUBSCRIBER_MAX_BUFFER:
+                log.warning("Dropping a subscriber that stopped reading")
+                self.subscribers.discard(connection)
+                connection.close()
+            else:
+                connection.write(line)
+
+
+# --------------------- Server ---------------------
+async def serve_forever(service, path):
+    connections = {}
+
+    async def handle(reader, writer):
+        connections[writer] = asyncio.current_task()
+        pending = b""
+        try:
+            while True:
+                data = await reader.read(READ_CHUNK_BYTES)
+                if not data:
+                    break
+                # Everything that arrived together is answered with one write: pipelined
+                # requests cost one syscall per chunk instead of one per request
+                lines = (pending + data).split(b"\n")
+                pending = lines.pop()
+                if len(pending) > MAX_REQUEST_BYTES:
+                    writer.write(encode({"id": None, "error": "request too long"}))
+                    break
+                writer.write(b"".join(service.handle_line(line, writer) for line in lines if line.strip()))
+                # Only a client that stops reading makes us wait
+                if writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            service.subscribers.discard(writer)
+            connections.pop(writer, None)
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path)
+    os.chmod(path, 0o600)
+    # Only now: whoever waits for this line may connect right away
+    print(f"MiniGrind daemon listening on {path}", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    async with server:
+        await stop.wait()
+        # Closing the connections ends their handlers normally instead of cancelling them
+        handlers = list(connections.values())
+        for writer in list(connections):
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_stale_socket(path):
+    # A socket file nobody listens on is left over from a daemon that died
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+    else:
+        raise RuntimeError(f"A daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def run(path=None):
+    path = path or socket_path()
+    remove_stale_socket(path)
+    settings = load_settings()
+    journal = Journal()
+    history = HistoryStore()
+    archive = archive_writer(settings)
+    sinks = export_pipeline(settings)
+    try:
+        store = TaskStore(journal, observers=[observer for observer in (history, archive, sinks) if observer],
+                          parallel=settings.get("parallel_timers", False))
+        if not store.restore() and settings.get("auto_load_predefined", True):
+            store.reset(settings.get("predefined_tasks", []))
+        service = TimerService(store, history, archive)
+        asyncio.run(serve_forever(service, path))
+    finally:
+        journal.close()
+        history.close()
+        if archive:
+            archive.close()
+        if sinks:
+            sinks.close()
+    return 0
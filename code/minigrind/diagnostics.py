@@ -0,0 +1,137 @@
+import json
+import os
+import platform
+import threading
+import time
+from collections import deque
+
+from .constants import VERSION_NUMBER
+
+DIAGNOSTICS_ENV = "MINIGRIND_DIAGNOSTICS"
+DIAGNOSTICS_FILE = "minigrind-diagnostics.json"
+RECENT_SAMPLES = 1024  # samples kept per probe for the rolling percentiles
+BUCKET_COUNT = 28      # power-of-two microsecond buckets: <1us up to >=67s
+
+
+# --------------------- Histogram ---------------------
+class Histogram:
+    # Log2 buckets over everything recorded since the last reset, plus a ring
+    # of the most recent samples for percentiles that follow the current behaviour
+    __slots__ = ("count", "total", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * BUCKET_COUNT
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKET_COUNT - 1)] += 1
+        self.recent.append(seconds)
+
+    def percentile(self, fraction, samples=None):
+        samples = samples if samples is not None else sorted(self.recent)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def summary(self):
+        samples = sorted(self.recent)
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else 0.0,
+            "p50_ms": self.percentile(0.50, samples) * 1e3,
+            "p95_ms": self.percentile(0.95, samples) * 1e3,
+            "p99_ms": self.percentile(0.99, samples) * 1e3,
+            "max_ms": self.max * 1e3,
+            # Upper bound of each bucket in microseconds -> samples in it; empty buckets left out
+            "buckets_us": {str(1 << i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+# --------------------- Probes ---------------------
+class _Measure:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class _NoMeasure:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_MEASURE = _NoMeasure()
+
+
+class Probes:
+    # Opt-in timing of named code paths. While disabled measure() hands out one
+    # shared no-op context manager, so an instrumented path costs a call and a branch.
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = bool(enabled)
+
+    def measure(self, name):
+        if not self.enabled:
+            return NO_MEASURE
+        return _Measure(self.histogram(name))
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            # Probes are also hit from worker threads; only creation needs the lock
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def summary(self):
+        return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def report(self):
+        return {
+            "version": VERSION_NUMBER,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "enabled": self.enabled,
+            "probes": self.summary(),
+        }
+
+    def dump(self, path=DIAGNOSTICS_FILE):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+        return path
+
+
+probes = Probes(enabled=bool(os.environ.get(DIAGNOSTICS_ENV)))
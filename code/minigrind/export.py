@@ -0,0 +1,86 @@
+import csv
+import os
+from datetime import datetime
+
+from .constants import WEEKDAYS
+from .task import format_seconds, format_task_date
+
+EXPORT_CHUNK_ROWS = 500
+EXPORT_BUFFER_SIZE = 1 << 16
+CSV_HEADER = ["Datum", "Taak", "Tijd (HH:MM:SS)"]
+
+
+def export_filename(now=None):
+    today = now or datetime.now()
+    weekday_name = WEEKDAYS[today.weekday()]
+    timestamp = today.strftime("%H-%M-%S")
+    return f"{weekday_name}, {today.strftime('%d.%m.%Y')}_{timestamp}_tasks_day.csv"
+
+
+def export_path(settings, now=None):
+    folder = settings.get("export_folder") or "."
+    return os.path.join(folder, export_filename(now))
+
+
+def export_pipeline(settings):
+    # The sinks for finished intervals, or None when none are configured. asyncio and
+    # http.client are only imported when there is somewhere to send to.
+    if not settings.get("export_sinks"):
+        return None
+    from .sinks import ExportPipeline
+    return ExportPipeline.from_settings(settings)
+
+
+def task_rows(snapshot):
+    for name, elapsed, start_time in snapshot:
+        yield format_task_date(start_time), name, format_seconds(elapsed)
+
+
+def format_day(day):
+    return datetime.strptime(day, "%Y-%m-%d").strftime("%a, %d.%m.%Y")
+
+
+def history_rows(daily_totals):
+    for day, name, seconds in daily_totals:
+        yield format_day(day), name, format_seconds(int(seconds))
+
+
+def write_csv(path, rows, header=CSV_HEADER, cancel=None, progress=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Streams rows in chunks; returns the row count, or None when cancelled.
+    # A cancelled or failed export never leaves a partial file behind.
+    written = 0
+    try:
+        with open(path, "w", newline="", buffering=EXPORT_BUFFER_SIZE) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    if cancel and cancel.is_set():
+                        break
+                    writer.writerows(chunk)
+                    written += len(chunk)
+                    chunk.clear()
+                    if progress:
+                        progress(written)
+            if chunk and not (cancel and cancel.is_set()):
+                writer.writerows(chunk)
+                written += len(chunk)
+                if progress:
+                    progress(written)
+    except Exception:
+        _discard(path)
+        raise
+
+    if cancel and cancel.is_set():
+        _discard(path)
+        return None
+    return written
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,24 @@
+import os
+import sys
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+
+from ..budget import FIRST_WINDOW_ENV, FIRST_WINDOW_MARKER
+from .window import TaskManager
+
+
+def run(argv=None):
+    app = QApplication(argv if argv is not None else sys.argv)
+    window = TaskManager()
+    window.show()
+    if os.environ.get(FIRST_WINDOW_ENV):
+        # `minigrind budget` measures up to the first event loop pass after show()
+        QTimer.singleShot(0, lambda: _report_first_window(window))
+    return app.exec()
+
+
+def _report_first_window(window):
+    print(FIRST_WINDOW_MARKER, flush=True)
+    window.close()
+    QApplication.quit()
@@ -0,0 +1,227 @@
+from PySide6 import QtGui
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (
+    QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel, QListWidget, QDialog, QComboBox,
+    QFileDialog, QFormLayout, QCheckBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
+)
+
+from ..constants import MAX_LOGGED_MINUTES
+from ..diagnostics import DIAGNOSTICS_FILE
+from .theme import THEME_NAMES
+
+
+# --------------------- Settings Dialog ---------------------
+class SettingsDialog(QDialog):
+    def __init__(self, parent=None, current_folder="", current_theme="System", predefined_tasks=None, auto_load_predefined=True,
+                 parallel_timers=False):
+        super().__init__(parent)
+        self.setWindowTitle("Settings")
+        self.setModal(True)
+        self.resize(400, 350)
+
+        self.export_folder = current_folder
+        self.theme = current_theme
+        self.predefined_tasks = predefined_tasks or []
+        self.auto_load_predefined = auto_load_predefined
+        self.parallel_timers = parallel_timers
+
+        layout = QVBoxLayout(self)
+
+        # ---- Export folder ----
+        folder_layout = QHBoxLayout()
+        self.folder_input = QLineEdit(self.export_folder)
+        self.browse_btn = QPushButton("Browse...")
+        folder_layout.addWidget(self.folder_input)
+        folder_layout.addWidget(self.browse_btn)
+        layout.addLayout(folder_layout)
+        self.browse_btn.clicked.connect(self.browse_folder)
+
+        for btn in [self.browse_btn]:
+            btn.setAutoDefault(False)
+            btn.setDefault(False)
+
+        # ---- Theme ----
+        self.theme_combo = QComboBox()
+        self.theme_combo.addItems(THEME_NAMES)
+        self.theme_combo.setCurrentText(self.theme)
+        layout.addWidget(QLabel("Thema:"))
+        layout.addWidget(self.theme_combo)
+
+        # ---- Predefined tasks ----
+        layout.addWidget(QLabel("Predefined tasks:"))
+        self.task_list = QListWidget()
+        self.task_list.addItems(self.predefined_tasks)
+        self.task_names = set(self.predefined_tasks)
+        layout.addWidget(self.task_list)
+
+        btn_task_layout = QHBoxLayout()
+        self.new_task_input = QLineEdit()
+        self.new_task_input.setPlaceholderText("New taskname...")
+        self.add_task_btn = QPushButton("Add")
+        self.remove_task_btn = QPushButton("Remove")
+        btn_task_layout.addWidget(self.new_task_input)
+        btn_task_layout.addWidget(self.add_task_btn)
+        btn_task_layout.addWidget(self.remove_task_btn)
+        layout.addLayout(btn_task_layout)
+
+        self.add_task_btn.clicked.connect(self.add_task)
+        self.remove_task_btn.clicked.connect(self.remove_task)
+        self.new_task_input.returnPressed.connect(self.add_task)
+
+        for btn in [self.add_task_btn, self.remove_task_btn]:
+            btn.setAutoDefault(False)
+            btn.setDefault(False)
+
+        # ---- Checkbox for auto load ----
+        self.auto_load_checkbox = QCheckBox("Load predefined tasks during startup")
+        self.auto_load_checkbox.setChecked(self.auto_load_predefined)
+        layout.addWidget(self.auto_load_checkbox)
+
+        # ---- Checkbox for parallel timers ----
+        self.parallel_checkbox = QCheckBox("Let several tasks run at the same time")
+        self.parallel_checkbox.setChecked(self.parallel_timers)
+        layout.addWidget(self.parallel_checkbox)
+
+        # ---- Save ----
+        self.save_btn = QPushButton("Save")
+        layout.addWidget(self.save_btn)
+        self.save_btn.clicked.connect(self.accept)
+        self.save_btn.setAutoDefault(False)
+        self.save_btn.setDefault(False)
+
+    def browse_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Choose folder")
+        if folder:
+            self.folder_input.setText(folder)
+
+    def add_task(self):
+        name = self.new_task_input.text().strip()
+        if name and name not in self.task_names:
+            self.task_names.add(name)
+            self.task_list.addItem(name)
+            self.new_task_input.clear()
+
+    def remove_task(self):
+        selected = self.task_list.currentItem()
+        if selected:
+            self.task_names.discard(selected.text())
+            self.task_list.takeItem(self.task_list.row(selected))
+
+    def get_settings(self):
+        tasks = [self.task_list.item(i).text() for i in range(self.task_list.count())]
+        return {
+            "export_folder": self.folder_input.text(),
+            "theme": self.theme_combo.currentText(),
+            "predefined_tasks": tasks,
+            "auto_load_predefined": self.auto_load_checkbox.isChecked(),
+            "parallel_timers": self.parallel_checkbox.isChecked()
+        }
+
+
+# --------------------- Create Afterwards Dialog ---------------------
+class CreateAfterDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Create Task Afterwards")
+        self.setModal(True)
+        self.resize(300, 150)
+
+        layout = QFormLayout(self)
+
+        self.task_name_input = QLineEdit()
+        self.task_name_input.setPlaceholderText("Task name")
+
+        self.minutes_input = QLineEdit()
+        self.minutes_input.setPlaceholderText("Time spent (minutes)")
+        self.minutes_input.setValidator(QtGui.QIntValidator(1, MAX_LOGGED_MINUTES))
+
+        layout.addRow("Task name:", self.task_name_input)
+        layout.addRow("Minutes spent:", self.minutes_input)
+
+        btn_layout = QHBoxLayout()
+        self.ok_btn = QPushButton("OK")
+        self.cancel_btn = QPushButton("Cancel")
+        btn_layout.addWidget(self.ok_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        layout.addRow(btn_layout)
+
+        self.ok_btn.clicked.connect(self.accept)
+        self.cancel_btn.clicked.connect(self.reject)
+
+    def get_data(self):
+        name = self.task_name_input.text().strip()
+        try:
+            minutes = int(self.minutes_input.text())
+        except ValueError:
+            minutes = 0
+        return name, minutes
+
+
+# --------------------- Diagnostics Dialog ---------------------
+class DiagnosticsDialog(QDialog):
+    COLUMNS = ["Path", "Count", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"]
+    KEYS = ["count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+    def __init__(self, parent, probes):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.setModal(True)
+        self.resize(640, 360)
+        self.probes = probes
+
+        layout = QVBoxLayout(self)
+
+        self.enabled_checkbox = QCheckBox("Record timings (small overhead while on)")
+        self.enabled_checkbox.setChecked(probes.enabled)
+        self.enabled_checkbox.toggled.connect(probes.enable)
+        layout.addWidget(self.enabled_checkbox)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        btn_layout = QHBoxLayout()
+        self.reset_btn = QPushButton("Reset")
+        self.dump_btn = QPushButton("Save JSON...")
+        self.close_btn = QPushButton("Close")
+        btn_layout.addWidget(self.reset_btn)
+        btn_layout.addWidget(self.dump_btn)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.close_btn)
+        layout.addLayout(btn_layout)
+
+        self.reset_btn.clicked.connect(self.reset)
+        self.dump_btn.clicked.connect(self.dump)
+        self.close_btn.clicked.connect(self.accept)
+
+        # Live while open; the timer belongs to the dialog and dies with it
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        summary = self.probes.summary()
+        self.table.setRowCount(len(summary))
+        for row, (name, values) in enumerate(summary.items()):
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+            for column, key in enumerate(self.KEYS, start=1):
+                value = values[key]
+                text = str(value) if key == "count" else f"{value:.3f}"
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+    def reset(self):
+        self.probes.reset()
+        self.refresh()
+
+    def dump(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save diagnostics", DIAGNOSTICS_FILE, "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.probes.dump(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Fout", f"Kon diagnostiek niet opslaan:\n{e}")
@@ -0,0 +1,45 @@
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from ..diagnostics import probes
+from ..export import CSV_HEADER, write_csv
+
+
+# --------------------- CSV Export Job ---------------------
+class ExportSignals(QObject):
+    progress = Signal(int, int)  # rows written, expected rows (0 when unknown)
+    finished = Signal(str, int)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class CsvExportJob(QRunnable):
+    def __init__(self, path, rows, total=0, header=CSV_HEADER):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.path = path
+        self.rows = rows
+        self.total = total
+        self.header = header
+        self.signals = ExportSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            with probes.measure("export_csv.worker"):
+                written = write_csv(
+                    self.path, self.rows, header=self.header, cancel=self._cancel,
+                    progress=lambda n: self.signals.progress.emit(n, self.total)
+                )
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        if written is None:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(self.path, written)
@@ -0,0 +1,131 @@
+import json
+import logging
+from contextlib import contextmanager
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtNetwork import QLocalSocket
+
+from ..client import encode
+
+log = logging.getLogger(__name__)
+
+LINK_TIMEOUT_MS = 1000
+
+
+# --------------------- Daemon Link ---------------------
+class DaemonLink(QObject):
+    # The window's TaskStore mirrors the daemon's. As an observer of that store the link
+    # forwards local changes; daemon events come in through `event` and are applied while
+    # muted, so they are not sent back. Every change, ours included, is echoed by the
+    # daemon, which makes its times the ones the window shows.
+    event = Signal(dict)
+    lost = Signal()
+
+    def __init__(self, socket, parent=None):
+        super().__init__(parent)
+        self.socket = socket
+        self.muted = False
+        self.parallel = False  # the daemon's parallel timers, as fetched with its state
+        self._batch = None  # requests held back during a bulk operation
+        self._next_id = 0
+        self._closing = False
+        socket.disconnected.connect(self._disconnected)
+
+    @classmethod
+    def connect_to(cls, path, parent=None):
+        socket = QLocalSocket(parent)
+        socket.connectToServer(path)
+        if not socket.waitForConnected(LINK_TIMEOUT_MS):
+            socket.deleteLater()
+            return None
+        return cls(socket, parent)
+
+    def close(self):
+        self._closing = True
+        self.socket.disconnectFromServer()
+
+    # ----------------- Requests -----------------
+    def send(self, op, **params):
+        self._next_id += 1
+        self.socket.write(encode(dict(params, op=op, id=self._next_id)))
+        # Written now rather than on the next event loop pass, so the daemon's time is the click's
+        self.socket.flush()
+        return self._next_id
+
+    def fetch_state(self):
+        # Blocking, once at startup: subscribe first so no change falls between state and
+        # events. Events only flow from here on; read_events() picks up what already arrived.
+        self.send("subscribe")
+        mode_id = self.send("mode")
+        request_id = self.send("state")
+        state = None
+        while state is None and (self.socket.canReadLine() or self.socket.waitForReadyRead(LINK_TIMEOUT_MS)):
+            while self.socket.canReadLine():
+                message = json.loads(bytes(self.socket.readLine()))
+                # Events before the state are already part of it
+                if message.get("id") == mode_id and "result" in message:
+                    self.parallel = message["result"]["parallel"]
+                elif message.get("id") == request_id:
+                    state = message["result"]
+                    break
+        self.socket.readyRead.connect(self.read_events)
+        return state
+
+    @contextmanager
+    def applying(self):
+        self.muted = True
+        try:
+            yield
+        finally:
+            self.muted = False
+
+    # ----------------- TaskStore observer -----------------
+    def task_added(self, task):
+        self.forward("add", task=task.name, total=task.total_seconds)
+
+    def task_removed(self, task):
+        self.forward("remove", task=task.name)
+
+    def task_started(self, task):
+        self.forward("start", task=task.name)
+
+    def task_paused(self, task):
+        self.forward("pause", task=task.name)
+
+    def task_logged(self, task):
+        self.forward("log", task=task.name, seconds=task.stops[-1] - task.starts[-1])
+
+    def batch_started(self):
+        self._batch = []
+
+    def batch_finished(self):
+        # A bulk operation goes out as one batch: one write, applied by the daemon in one go
+        requests, self._batch = self._batch, None
+        if requests:
+            self.send("batch", ops=requests)
+
+    def forward(self, op, **params):
+        if self.muted:
+            return
+        if self._batch is not None:
+            self._batch.append(dict(params, op=op))
+        else:
+            self.send(op, **params)
+
+    # ----------------- Incoming -----------------
+    def read_events(self):
+        while self.socket.canReadLine():
+            message = json.loads(bytes(self.socket.readLine()))
+            if "event" in message:
+                self.event.emit(message)
+            elif "error" in message:
+                log.warning("Daemon refused a change: %s", message["error"])
+            elif isinstance(message.get("result"), list):
+                # A batch answers with one response per request
+                for response in message["result"]:
+                    if isinstance(response, dict) and "error" in response:
+                        log.warning("Daemon refused a change: %s", response["error"])
+
+    def _disconnected(self):
+        if not self._closing:
+            self.lost.emit()
@@ -0,0 +1,266 @@
+from bisect import bisect_left, bisect_right
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor
+
+from ..search import NameIndex
+from ..task import wall_clock
+
+HIGHLIGHT_ROLES = [Qt.BackgroundRole, Qt.ForegroundRole]
+RECONCILE_MAX_RUNS = 32  # more separate runs of removed rows than this and the model resets instead
+
+
+# --------------------- Task List Model ---------------------
+class TaskListModel(QAbstractListModel):
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        # Highlighted rows: the running tasks and the selected ones, as last painted
+        self.selected_tasks = frozenset()
+        self._running = frozenset()
+        # Set from the theme; see set_colors()
+        self.running_color = QColor("#00FF00")
+        self.selected_color = QColor("#3399FF")
+        self.highlight_text = QColor("#000000")
+
+    def __len__(self):
+        return len(self.store)
+
+    def __iter__(self):
+        return iter(self.store)
+
+    def __contains__(self, name):
+        return name in self.store
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.task_data(self.store.task_at(index.row()), role)
+
+    def task_data(self, task, role):
+        if role == Qt.DisplayRole:
+            return f"{task.name}  ({task.get_time_str()})"
+        if role == Qt.BackgroundRole:
+            if task.running:
+                return self.running_color
+            if task in self.selected_tasks:
+                return self.selected_color
+        if role == Qt.ForegroundRole:
+            if task.running or task in self.selected_tasks:
+                return self.highlight_text
+        return None
+
+    def task_at(self, row):
+        return self.store.task_at(row)
+
+    # ----------------- Mutations -----------------
+    def add(self, name, total_seconds=0):
+        if name in self.store:
+            return None
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row)
+        task = self.store.add(name, total_seconds)
+        self.endInsertRows()
+        return task
+
+    def remove(self, task):
+        row = self.store.row_of(task)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.store.remove(task)
+        self._forget([task])
+        self.endRemoveRows()
+        return True
+
+    def remove_many(self, tasks, add=()):
+        # Removals reach the view as runs of adjacent rows, the names in `add` as one block
+        # at the end. Heavily scattered removals are cheaper as a reset.
+        tasks = [task for task in tasks if self.store.row_of(task) >= 0]
+        rows = sorted(self.store.row_of(task) for task in tasks)
+        runs = []
+        for row in rows:
+            if runs and runs[-1][1] == row - 1:
+                runs[-1][1] = row
+            else:
+                runs.append([row, row])
+
+        if len(runs) > RECONCILE_MAX_RUNS:
+            self.beginResetModel()
+            self.store.remove_many(tasks)
+            for name in add:
+                self.store.add(name)
+            self._forget(tasks)
+            self.endResetModel()
+            return len(tasks)
+
+        # One store call per run, so the view sees each run go, all in one batch (one request
+        # for a daemon) and with one pause time for the running timers among them
+        with self.store.batch():
+            now = wall_clock()
+            for first, last in reversed(runs):
+                self.beginRemoveRows(QModelIndex(), first, last)
+                self.store.remove_many([self.store.task_at(row) for row in range(first, last + 1)], now)
+                self.endRemoveRows()
+        self._forget(tasks)
+        if add:
+            row = len(self.store)
+            self.beginInsertRows(QModelIndex(), row, row + len(add) - 1)
+            for name in add:
+                self.store.add(name)
+            self.endInsertRows()
+        return len(tasks)
+
+    def log_time(self, tasks, seconds):
+        tasks = self.store.log_time(tasks, seconds)
+        self.refresh_many(tasks, [Qt.DisplayRole])
+        return tasks
+
+    def reconcile(self, old_names, new_names):
+        # Only the difference reaches the view
+        remove, add = self.store.predefined_changes(old_names, new_names)
+        self.remove_many(remove, add)
+        return remove, add
+
+    def _forget(self, tasks):
+        self.selected_tasks = self.selected_tasks.difference(tasks)
+        self._running = self._running.difference(tasks)
+
+    def reset(self, names):
+        self.beginResetModel()
+        self.store.reset(names)
+        self.selected_tasks = self._running = frozenset()
+        self.endResetModel()
+
+    def restore(self):
+        self.beginResetModel()
+        restored = self.store.restore()
+        self.endResetModel()
+        return restored
+
+    def load(self, tasks):
+        self.beginResetModel()
+        self.store.load(tasks)
+        self.selected_tasks = self._running = frozenset()
+        self.endResetModel()
+
+    # ----------------- Highlighting -----------------
+    def refresh(self, task, roles=None):
+        row = self.store.row_of(task)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, roles or [])
+
+    def refresh_many(self, tasks, roles=None):
+        # One dataChanged from the first to the last row instead of one per task; the view
+        # only repaints what of that range is on screen
+        rows = [row for row in map(self.store.row_of, tasks) if row >= 0]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)), roles or [])
+
+    def set_highlight(self, selected_tasks):
+        # Costs the number of running and selected tasks, not the length of the list
+        running = frozenset(self.store.running.values())
+        selected = frozenset(selected_tasks)
+        changed = (running ^ self._running) | (selected ^ self.selected_tasks)
+        self.selected_tasks, self._running = selected, running
+        self.refresh_many(changed, HIGHLIGHT_ROLES)
+
+    def set_colors(self, running, selected, highlight_text):
+        # Only the highlighted rows use these colours, so only they need a repaint
+        self.running_color = running
+        self.selected_color = selected
+        self.highlight_text = highlight_text
+        self.refresh_many(self._running | self.selected_tasks, HIGHLIGHT_ROLES)
+
+
+# --------------------- Task Filter Model ---------------------
+class TaskFilterModel(QAbstractListModel):
+    # Type-ahead filter in front of TaskListModel. The visible source rows are one sorted
+    # list, so mapping either way is an index or a bisect and one search replaces the
+    # whole list. A list model rather than a QAbstractProxyModel: the view asks for
+    # index() and parent() all the time, and those should stay in C++.
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.query = ""
+        self.names = NameIndex(task.name for task in source)
+        self._rows = self.names.search("")
+
+        source.rowsInserted.connect(self._on_rows_inserted)
+        source.rowsAboutToBeRemoved.connect(self._on_rows_about_to_be_removed)
+        source.rowsRemoved.connect(self._on_rows_removed)
+        source.modelAboutToBeReset.connect(self.beginResetModel)
+        source.modelReset.connect(self._on_model_reset)
+        source.dataChanged.connect(self._on_data_changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.source.task_data(self.task_at(index.row()), role)
+
+    def task_at(self, row):
+        if 0 <= row < len(self._rows):
+            return self.source.task_at(self._rows[row])
+        return None
+
+    def row_of(self, task):
+        source_row = self.source.store.row_of(task)
+        row = bisect_left(self._rows, source_row)
+        if source_row >= 0 and row < len(self._rows) and self._rows[row] == source_row:
+            return row
+        return -1
+
+    def set_filter(self, query):
+        query = query.strip()
+        if query == self.query:
+            return
+        self.beginResetModel()
+        self.query = query
+        self._rows = self.names.search(query)
+        self.endResetModel()
+
+    # ----------------- Source changes -----------------
+    def _on_rows_inserted(self, parent, first, last):
+        count = last - first + 1
+        self.names.insert(first, [self.source.task_at(row).name for row in range(first, last + 1)])
+        # New rows are appended in practice; rows after them only move on the source side
+        position = bisect_left(self._rows, first)
+        for i in range(position, len(self._rows)):
+            self._rows[i] += count
+        added = [row for row in range(first, last + 1) if self.names.matches(row, self.query)]
+        if added:
+            self.beginInsertRows(QModelIndex(), position, position + len(added) - 1)
+            self._rows[position:position] = added
+            self.endInsertRows()
+
+    def _on_rows_about_to_be_removed(self, parent, first, last):
+        lo = bisect_left(self._rows, first)
+        hi = bisect_right(self._rows, last)
+        if hi > lo:
+            self.beginRemoveRows(QModelIndex(), lo, hi - 1)
+            del self._rows[lo:hi]
+            self.endRemoveRows()
+
+    def _on_rows_removed(self, parent, first, last):
+        count = last - first + 1
+        self.names.remove(first, last)
+        for i in range(bisect_left(self._rows, first), len(self._rows)):
+            self._rows[i] -= count
+
+    def _on_model_reset(self):
+        self.names.reset(task.name for task in self.source)
+        self._rows = self.names.search(self.query)
+        self.endResetModel()
+
+    def _on_data_changed(self, top_left, bottom_right, roles=()):
+        lo = bisect_left(self._rows, top_left.row())
+        hi = bisect_right(self._rows, bottom_right.row())
+        if hi > lo:
+            self.dataChanged.emit(self.index(lo), self.index(hi - 1), roles)
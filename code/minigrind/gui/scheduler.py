@@ -0,0 +1,79 @@
+import time
+
+from PySide6.QtCore import Qt, QObject, QTimer
+
+from ..diagnostics import probes
+
+TICK_SLACK_MS = 2  # land just past the second boundary so int() has rolled over
+
+
+# --------------------- Render Scheduler ---------------------
+class RenderScheduler(QObject):
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.visible = False
+        self._texts = {}
+        # perf_counter() deadlines, only kept while diagnostics are on
+        self._flush_due = None
+        self._tick_due = None
+
+        # Zero-delay single shot: any number of invalidate() calls in one event loop pass -> one render
+        self._flush = QTimer(self)
+        self._flush.setSingleShot(True)
+        self._flush.setInterval(0)
+        self._flush.timeout.connect(self._on_flush)
+
+        self._tick = QTimer(self)
+        self._tick.setSingleShot(True)
+        self._tick.setTimerType(Qt.PreciseTimer)
+        self._tick.timeout.connect(self._on_tick)
+
+    def invalidate(self):
+        if self.visible and not self._flush.isActive():
+            self._flush.start()
+            self._flush_due = time.perf_counter() if probes.enabled else None
+
+    def set_visible(self, visible):
+        if visible == self.visible:
+            return
+        self.visible = visible
+        if visible:
+            self.invalidate()
+        else:
+            self._flush.stop()
+            self._tick.stop()
+
+    def set_text(self, label, text):
+        if self._texts.get(label) != text:
+            self._texts[label] = text
+            label.setText(text)
+
+    def render(self):
+        self._flush.stop()
+        self.window.update_ui()
+        self._arm()
+
+    # Event loop latency: how late the timers fire compared to when they were due
+    def _on_flush(self):
+        if self._flush_due is not None:
+            probes.record("event_loop.flush_latency", time.perf_counter() - self._flush_due)
+            self._flush_due = None
+        self.render()
+
+    def _on_tick(self):
+        if self._tick_due is not None:
+            probes.record("event_loop.tick_drift", abs(time.perf_counter() - self._tick_due))
+            self._tick_due = None
+        self.render()
+
+    def _arm(self):
+        running = self.window.store.running
+        if not (self.visible and running):
+            self._tick.stop()
+            return
+        # Wake up exactly when the first displayed elapsed time rolls over to the next second
+        fraction = max(task.get_elapsed() % 1 for task in running.values())
+        delay = int((1 - fraction) * 1000) + TICK_SLACK_MS
+        self._tick.start(delay)
+        self._tick_due = time.perf_counter() + delay / 1000 if probes.enabled else None
@@ -0,0 +1,73 @@
+from PySide6.QtGui import QColor, QFont, QPalette
+from PySide6.QtWidgets import QApplication
+
+# Palette roles per theme; roles left out keep the platform's colour. "System" is
+# whatever palette the application started with.
+THEMES = {
+    "System": {
+        "palette": {},
+        "running": "#00FF00",
+        "selected": "#3399FF",
+        "highlight_text": "#000000",
+    },
+    "Light": {
+        "palette": {
+            "Window": "#ffffff", "WindowText": "#000000", "Base": "#ffffff", "AlternateBase": "#f2f2f2",
+            "Text": "#000000", "Button": "#f0f0f0", "ButtonText": "#000000", "ToolTipBase": "#ffffdc",
+            "ToolTipText": "#000000", "PlaceholderText": "#808080", "Highlight": "#3399ff",
+            "HighlightedText": "#ffffff", "BrightText": "#ff0000", "Link": "#0066cc",
+        },
+        "running": "#00FF00",
+        "selected": "#3399FF",
+        "highlight_text": "#000000",
+    },
+    "Dark": {
+        "palette": {
+            "Window": "#2b2b2b", "WindowText": "#ffffff", "Base": "#232323", "AlternateBase": "#2f2f2f",
+            "Text": "#ffffff", "Button": "#3a3a3a", "ButtonText": "#ffffff", "ToolTipBase": "#3a3a3a",
+            "ToolTipText": "#ffffff", "PlaceholderText": "#9a9a9a", "Highlight": "#2f65ca",
+            "HighlightedText": "#ffffff", "BrightText": "#ff5555", "Link": "#6ea8fe",
+        },
+        "running": "#2e9e44",
+        "selected": "#2f65ca",
+        "highlight_text": "#ffffff",
+    },
+}
+THEME_NAMES = list(THEMES)
+DEFAULT_THEME = "System"
+
+
+# --------------------- Compiled themes ---------------------
+class Theme:
+    def __init__(self, name, palette, running, selected, highlight_text):
+        self.name = name
+        self.palette = palette
+        self.running = running
+        self.selected = selected
+        self.highlight_text = highlight_text
+
+
+_compiled = {}
+
+
+def get_theme(name):
+    # Everything is compiled on first use; the system palette has to be captured
+    # before any other theme replaces the application palette
+    if not _compiled:
+        system = QPalette(QApplication.palette())
+        for theme_name, spec in THEMES.items():
+            palette = QPalette(system)
+            for role, color in spec["palette"].items():
+                palette.setColor(getattr(QPalette.ColorRole, role), QColor(color))
+            _compiled[theme_name] = Theme(
+                theme_name, palette, QColor(spec["running"]), QColor(spec["selected"]),
+                QColor(spec["highlight_text"])
+            )
+    return _compiled.get(name) or _compiled[DEFAULT_THEME]
+
+
+def label_font(widget, pixel_size, bold=False):
+    font = QFont(widget.font())
+    font.setPixelSize(pixel_size)
+    font.setBold(bold)
+    return font
@@ -0,0 +1,24 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QListView
+
+LAYOUT_BATCH_ROWS = 200
+
+
+# --------------------- Task List View ---------------------
+class TaskListView(QListView):
+    # QListView lays out every row again on each dataChanged, which makes a highlight or
+    # elapsed-time refresh O(rows). With uniform item sizes nothing but a size hint can move
+    # a row, so for everything else repainting the changed rows is enough.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # A full layout asks the model about every row, through Python; after a reset or a
+        # new filter, lay out a batch per event loop pass so the first rows show at once
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(LAYOUT_BATCH_ROWS)
+
+    def dataChanged(self, top_left, bottom_right, roles=()):
+        if not self.uniformItemSizes() or not roles or Qt.SizeHintRole in roles:
+            super().dataChanged(top_left, bottom_right, roles)
+            return
+        rect = self.visualRect(top_left).united(self.visualRect(bottom_right))
+        self.viewport().update(rect)
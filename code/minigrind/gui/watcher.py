@@ -0,0 +1,44 @@
+import os
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+
+WATCH_DEBOUNCE_MS = 100  # one save fires several file/directory events
+
+
+# --------------------- Settings Watcher ---------------------
+class SettingsWatcher(QObject):
+    changed = Signal(object)  # set of setting keys changed by someone else
+    failed = Signal(str)      # a background save failed
+
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        # The writer thread reports through a signal, which lands on the GUI thread
+        settings.on_error = lambda error: self.failed.emit(str(error))
+
+        self._path = os.path.abspath(settings.path)
+        self._watcher = QFileSystemWatcher(self)
+        # Atomic saves rename a new file over the old one, which drops it from the watch
+        # list; the directory sees the rename, the file itself sees in-place edits
+        self._watcher.addPath(os.path.dirname(self._path))
+        self._watch_file()
+        self._watcher.fileChanged.connect(self._schedule)
+        self._watcher.directoryChanged.connect(self._schedule)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(WATCH_DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.reload)
+
+    def _watch_file(self):
+        if self._path not in self._watcher.files() and os.path.exists(self._path):
+            self._watcher.addPath(self._path)
+
+    def _schedule(self, path):
+        self._debounce.start()
+
+    def reload(self):
+        self._watch_file()
+        changed = self.settings.reload()
+        if changed:
+            self.changed.emit(changed)
@@ -0,0 +1,545 @@
+import os
+
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel,
+    QAbstractItemView, QMessageBox, QDialog, QProgressDialog, QStackedLayout, QApplication, QInputDialog
+)
+from PySide6.QtCore import Qt, QEvent, QSize, QThreadPool
+
+from ..archive import archive_writer
+from ..client import socket_path
+from ..constants import MAX_LOGGED_MINUTES, VERSION_NUMBER
+from ..diagnostics import probes
+from ..export import export_path, export_pipeline, task_rows
+from ..history import HistoryStore
+from ..journal import Journal
+from ..settings import SettingsStore
+from ..store import TaskStore
+from .dialogs import SettingsDialog, CreateAfterDialog, DiagnosticsDialog
+from .jobs import CsvExportJob
+from .models import TaskListModel, TaskFilterModel
+from .scheduler import RenderScheduler
+from .theme import get_theme, label_font
+from .views import TaskListView
+from .watcher import SettingsWatcher
+
+MINI_MODE_SIZE = QSize(300, 80)
+QWIDGETSIZE_MAX = 16777215
+
+
+# --------------------- Task Manager ---------------------
+class TaskManager(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("MiniGrind - by MipADeV")
+        self.resize(500, 400)
+
+        # With a daemon running it owns the tasks and this window mirrors them
+        self.link = self.connect_daemon()
+        if self.link:
+            self.journal = self.history = None
+            # The daemon decides what else a start pauses and tells us; locally nothing is exclusive
+            self.store = TaskStore(observers=[self.link], parallel=True)
+        else:
+            self.journal = Journal()
+            self.history = HistoryStore()
+            self.store = TaskStore(self.journal, observers=[self.history])
+        self.task_model = TaskListModel(self.store, self)
+        self.task_filter = TaskFilterModel(self.task_model, self)
+        self.export_job = None
+        self.export_progress = None
+        self.load_settings()
+        if self.settings.get("diagnostics"):
+            probes.enable()
+        if not self.link:
+            self.store.parallel = self.settings.get("parallel_timers", False)
+        # Finished intervals go to the archive and the configured sinks; with a daemon it does that
+        self.archive = self.sinks = None
+        if not self.link:
+            self.apply_archive()
+            self.apply_export_sinks()
+        self.settings_watcher = SettingsWatcher(self.settings, self)
+        self.settings_watcher.changed.connect(self.on_settings_changed)
+        self.settings_watcher.failed.connect(self.on_settings_failed)
+
+        # Both views are built once; Mini Mode only switches pages and window size
+        self.pages = QStackedLayout(self)
+        self.pages.setContentsMargins(0, 0, 0, 0)
+        self.full_page = QWidget()
+        self.layout = QVBoxLayout(self.full_page)
+        self.pages.addWidget(self.full_page)
+
+        # ----------------- Compact timer panel -----------------
+        self.compact_panel = QWidget()
+        panel_layout = QVBoxLayout(self.compact_panel)
+        self.active_task_label = QLabel("No task running")
+        self.active_task_label.setAlignment(Qt.AlignCenter)
+        self.active_task_label.setFont(label_font(self.active_task_label, 14, bold=True))
+        self.timer_label = QLabel("00:00:00")
+        self.timer_label.setAlignment(Qt.AlignCenter)
+        self.timer_label.setFont(label_font(self.timer_label, 24))
+        panel_layout.addWidget(self.active_task_label)
+        panel_layout.addWidget(self.timer_label)
+        self.layout.addWidget(self.compact_panel)
+
+        # ----------------- Task input -----------------
+        input_layout = QHBoxLayout()
+        self.task_input = QLineEdit()
+        self.task_input.setPlaceholderText("New task...")
+        self.add_btn = QPushButton("Add")
+        self.remove_btn = QPushButton("Remove")
+
+        self.settings_btn = QPushButton("⚙️")
+        self.settings_btn.setToolTip("Settings")
+        self.settings_btn.setFixedWidth(35)
+
+        input_layout.addWidget(self.task_input)
+        input_layout.addWidget(self.add_btn)
+        input_layout.addWidget(self.remove_btn)
+        input_layout.addWidget(self.settings_btn)
+        self.layout.addLayout(input_layout)
+
+        # ----------------- Task list -----------------
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search tasks...")
+        self.search_input.setClearButtonEnabled(True)
+        self.layout.addWidget(self.search_input)
+
+        self.task_list = TaskListView()
+        self.task_list.setModel(self.task_filter)
+        self.task_list.setUniformItemSizes(True)
+        self.task_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.layout.addWidget(self.task_list)
+
+        # ----------------- Control buttons -----------------
+        btn_layout = QHBoxLayout()
+        self.start_btn = QPushButton("Start / Resume")
+        self.pause_btn = QPushButton("Pauze")
+        self.create_after_btn = QPushButton("Quick Task")
+        self.add_time_btn = QPushButton("Add Time")
+        self.export_btn = QPushButton("Export CSV")
+        self.mini_mode_btn = QPushButton("Mini Mode")
+        self.show_about_btn = QPushButton("About")
+        self.diagnostics_btn = QPushButton("Diagnostics")
+
+        btn_layout.addWidget(self.start_btn)
+        btn_layout.addWidget(self.pause_btn)
+        btn_layout.addWidget(self.create_after_btn)
+        btn_layout.addWidget(self.add_time_btn)
+        btn_layout.addWidget(self.export_btn)
+        btn_layout.addWidget(self.mini_mode_btn)
+        btn_layout.addWidget(self.show_about_btn)
+        btn_layout.addWidget(self.diagnostics_btn)
+        self.layout.addLayout(btn_layout)
+
+        # ----------------- Mini page -----------------
+        self.mini_page = QWidget()
+        mini_layout = QHBoxLayout(self.mini_page)
+        self.mini_task_label = QLabel("No task running")
+        self.mini_task_label.setFont(label_font(self.mini_task_label, 12, bold=True))
+        self.mini_timer_label = QLabel("00:00:00")
+        self.mini_timer_label.setFont(label_font(self.mini_timer_label, 16))
+        mini_layout.addWidget(self.mini_task_label)
+        mini_layout.addSpacing(10)
+        mini_layout.addWidget(self.mini_timer_label)
+        self.pages.addWidget(self.mini_page)
+        self.full_size = self.size()
+
+        # ----------------- Connections -----------------
+        self.add_btn.clicked.connect(self.add_task)
+        self.task_input.returnPressed.connect(self.add_task)
+        self.search_input.textChanged.connect(self.filter_tasks)
+        self.remove_btn.clicked.connect(self.remove_task)
+        self.settings_btn.clicked.connect(self.open_settings)
+        self.start_btn.clicked.connect(self.start_task)
+        self.pause_btn.clicked.connect(self.pause_task)
+        self.export_btn.clicked.connect(self.export_csv)
+        self.create_after_btn.clicked.connect(self.create_afterwards)
+        self.add_time_btn.clicked.connect(self.add_time)
+        self.task_list.selectionModel().selectionChanged.connect(self.update_task_highlight)
+        self.mini_mode_btn.clicked.connect(self.toggle_mini_mode)
+        self.show_about_btn.clicked.connect(self.show_about)
+        self.diagnostics_btn.clicked.connect(self.show_diagnostics)
+
+        self.is_mini_mode = False
+
+        # ----------------- Rendering -----------------
+        self.scheduler = RenderScheduler(self)
+
+        self.apply_theme(self.settings.get("theme", "System"))
+
+        if not self.restore_tasks() and self.settings.get("auto_load_predefined", True):
+            self.load_predefined_tasks()
+
+    @property
+    def current_task(self):
+        return self.store.current_task
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.scheduler.set_visible(not self.isMinimized())
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.scheduler.set_visible(False)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.scheduler.set_visible(self.isVisible() and not self.isMinimized())
+
+    def closeEvent(self, event):
+        if self.export_job:
+            self.export_job.cancel()
+            QThreadPool.globalInstance().waitForDone()
+        if self.link:
+            self.link.close()
+        else:
+            self.journal.close()
+            self.history.close()
+        if self.archive:
+            self.archive.close()
+        if self.sinks:
+            self.sinks.close()
+        self.settings.close()
+        super().closeEvent(event)
+
+    # ----------------- Journal / daemon -----------------
+    def restore_tasks(self):
+        if self.link:
+            # The daemon loaded the predefined tasks when it started, if it had to
+            self.task_model.load(self.link.fetch_state() or {})
+            self.link.event.connect(self.on_daemon_event)
+            self.link.lost.connect(self.on_daemon_lost)
+            self.link.read_events()
+        elif not self.task_model.restore():
+            return False
+        self.update_task_highlight()
+        return True
+
+    def connect_daemon(self):
+        path = socket_path()
+        if not os.path.exists(path):
+            return None
+        # QtNetwork is only loaded when there is a daemon to talk to
+        from .link import DaemonLink
+        return DaemonLink.connect_to(path, self)
+
+    def on_daemon_event(self, message):
+        # Changes from any client, this window's own included; the daemon's times win
+        event, state = message["event"], message["task"]
+        task = self.store.get(state["name"])
+        with self.link.applying():
+            if event == "task_removed":
+                if task:
+                    self.task_model.remove(task)
+            else:
+                if task is None:
+                    task = self.task_model.add(state["name"], state["total"])
+                if event == "task_started" and not task.running:
+                    self.store.start(task, state["start"])
+                elif event == "task_paused" and task.running:
+                    self.store.pause_task(task, state["last"][1] if state["last"] else None)
+                elif event == "task_logged" and state["last"] and state["total"] > task.total_seconds + 1e-6:
+                    # Logged by another client; our own arrives with the time already here
+                    start, stop = state["last"]
+                    self.store.log_time([task], stop - start, stop)
+                self.store.sync(task, state["total"], state["start"], state["last"])
+        self.update_task_highlight()
+
+    def on_daemon_lost(self):
+        self.show_message(
+            QMessageBox.Warning, "Daemon",
+            "Lost the connection to the MiniGrind daemon. Changes are no longer saved; restart MiniGrind to reconnect."
+        )
+
+    # ----------------- Task operations -----------------
+    def selected_task(self):
+        index = self.task_list.currentIndex()
+        return self.task_filter.task_at(index.row()) if index.isValid() else None
+
+    def selected_tasks(self):
+        # In list order
+        rows = sorted(index.row() for index in self.task_list.selectionModel().selectedRows())
+        return [self.task_filter.task_at(row) for row in rows]
+
+    def select_task(self, task):
+        row = self.task_filter.row_of(task) if task else -1
+        if row >= 0:
+            self.task_list.setCurrentIndex(self.task_filter.index(row))
+
+    def filter_tasks(self, text):
+        task = self.selected_task()
+        self.task_filter.set_filter(text)
+        # Filtering rebuilds the list; keep the selection when the task is still shown
+        self.select_task(task)
+        self.update_task_highlight()
+
+    def add_task(self):
+        name = self.task_input.text().strip()
+        if name:
+            if name in self.task_model:
+                QMessageBox.warning(self, "Duplicate Task", "A task with this name already exists.")
+                return
+            self.task_model.add(name)
+            self.task_input.clear()
+
+    def remove_task(self):
+        tasks = self.selected_tasks()
+        if not tasks:
+            return
+        what = f"'{tasks[0].name}'" if len(tasks) == 1 else f"these {len(tasks)} tasks"
+        reply = QMessageBox.question(
+            self, "Please confirm",
+            f"Are you sure you want to remove {what}?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.task_model.remove_many(tasks)
+            self.update_task_highlight()
+
+    def start_task(self):
+        tasks = self.selected_tasks()
+        if not tasks:
+            return
+        current = self.selected_task()
+        # A daemon keeps the mode it started with, whatever the settings say now
+        if self.link.parallel if self.link else self.store.parallel:
+            # All of them; the current row last, so its time is the one on the timer panel
+            tasks = [task for task in tasks if task is not current] + [task for task in tasks if task is current]
+        else:
+            tasks = [current if current in tasks else tasks[-1]]
+        self.store.start_many(tasks)
+        self.update_task_highlight()
+
+    def pause_task(self):
+        # The selected tasks that run, or every running task when none of them does
+        running = [task for task in self.selected_tasks() if task.running]
+        if self.store.pause_many(running or None):
+            self.update_task_highlight()
+
+    def add_time(self):
+        tasks = self.selected_tasks()
+        if not tasks:
+            QMessageBox.information(self, "Add Time", "Select the tasks to add time to first.")
+            return
+        minutes, ok = QInputDialog.getInt(
+            self, "Add Time", f"Minutes spent on {len(tasks)} selected task(s):", 15, 1, MAX_LOGGED_MINUTES
+        )
+        if ok:
+            self.task_model.log_time(tasks, minutes * 60)
+            self.update_task_highlight()
+
+    # ----------------- Create Afterwards -----------------
+    def create_afterwards(self):
+        dlg = CreateAfterDialog(self)
+        if dlg.exec() == QDialog.Accepted:
+            name, minutes = dlg.get_data()
+            if not name:
+                QMessageBox.warning(self, "Missing Name", "Please enter a task name.")
+                return
+            if minutes <= 0:
+                QMessageBox.warning(self, "Invalid Time", "Please enter a positive number of minutes.")
+                return
+            if name in self.task_model:
+                QMessageBox.warning(self, "Duplicate Task", "A task with this name already exists.")
+                return
+
+            self.task_model.add(name, minutes * 60)
+            QMessageBox.information(self, "Task Added", f"Added task '{name}' with {minutes} minutes logged.")
+
+    # ----------------- About dialog -----------------
+    def show_about(self):
+        QMessageBox.information(self, "About MiniGrind", f"MiniGrind - {VERSION_NUMBER}\nby MipADeV\n\nA simple task timer application.")
+
+    # ----------------- Diagnostics -----------------
+    def show_diagnostics(self):
+        was_enabled = probes.enabled
+        DiagnosticsDialog(self, probes).exec()
+        if probes.enabled != was_enabled:
+            self.settings["diagnostics"] = probes.enabled
+
+    # ----------------- UI updates -----------------
+    def update_task_highlight(self):
+        with probes.measure("update_task_highlight"):
+            self.task_model.set_highlight(self.selected_tasks())
+            self.scheduler.invalidate()
+
+    def update_ui(self):
+        with probes.measure("update_ui"):
+            task = self.current_task
+            # Only the labels of the page on screen; switching pages invalidates the scheduler
+            if self.is_mini_mode:
+                task_label, timer_label = self.mini_task_label, self.mini_timer_label
+            else:
+                task_label, timer_label = self.active_task_label, self.timer_label
+            if task:
+                others = len(self.store.running) - 1
+                self.scheduler.set_text(timer_label, task.get_time_str())
+                self.scheduler.set_text(task_label, f"Running task: {task.name}" + (f" (+{others})" if others else ""))
+                if not self.is_mini_mode:
+                    # Only the running rows' time changes between ticks
+                    self.task_model.refresh_many(self.store.running.values(), [Qt.DisplayRole])
+            else:
+                self.scheduler.set_text(timer_label, "00:00:00")
+                self.scheduler.set_text(task_label, "No task running")
+
+    # ----------------- CSV export -----------------
+    def export_csv(self):
+        if self.export_job:
+            return
+        if not len(self.task_model):
+            QMessageBox.information(self, "Geen taken", "Er zijn geen taken om te exporteren.")
+            return
+
+        # Only the GUI thread's share; the worker is timed as export_csv.worker
+        with probes.measure("export_csv"):
+            full_path = export_path(self.settings)
+
+            # Freeze the values on the GUI thread; formatting and writing happen on the worker
+            snapshot = self.store.snapshot()
+            self.export_job = CsvExportJob(full_path, task_rows(snapshot), total=len(snapshot))
+            self.export_job.signals.progress.connect(self.on_export_progress)
+            self.export_job.signals.finished.connect(self.on_export_finished)
+            self.export_job.signals.failed.connect(self.on_export_failed)
+            self.export_job.signals.cancelled.connect(self.on_export_done)
+
+            self.export_progress = QProgressDialog("CSV exporteren...", "Annuleren", 0, len(snapshot), self)
+            self.export_progress.setWindowModality(Qt.NonModal)
+            self.export_progress.setMinimumDuration(500)
+            self.export_progress.canceled.connect(self.export_job.cancel)
+            self.export_btn.setEnabled(False)
+            QThreadPool.globalInstance().start(self.export_job)
+
+    def on_export_progress(self, written, total):
+        if self.export_progress:
+            self.export_progress.setMaximum(max(total, written))
+            self.export_progress.setValue(written)
+
+    def on_export_finished(self, path, rows):
+        self.on_export_done()
+        self.show_message(QMessageBox.Information, "Exporteren", f"CSV opgeslagen als:\n{path}")
+
+    def on_export_failed(self, error):
+        self.on_export_done()
+        self.show_message(QMessageBox.Warning, "Fout", f"Kon CSV niet opslaan:\n{error}")
+
+    def on_export_done(self):
+        if self.export_progress:
+            self.export_progress.canceled.disconnect()
+            self.export_progress.close()
+            self.export_progress = None
+        self.export_job = None
+        self.export_btn.setEnabled(True)
+
+    def show_message(self, icon, title, text):
+        box = QMessageBox(icon, title, text, QMessageBox.Ok, self)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.open()
+
+    # ----------------- Settings -----------------
+    def open_settings(self):
+        # Timed up to the dialog showing and from accept onwards; the time spent in it is the user's
+        with probes.measure("open_settings"):
+            dlg = SettingsDialog(
+                self,
+                current_folder=self.settings.get("export_folder", ""),
+                current_theme=self.settings.get("theme", "System"),
+                predefined_tasks=self.settings.get("predefined_tasks", []),
+                auto_load_predefined=self.settings.get("auto_load_predefined", True),
+                parallel_timers=self.settings.get("parallel_timers", False)
+            )
+        if dlg.exec() == QDialog.Accepted:
+            with probes.measure("open_settings.apply"):
+                # Switching auto-load on counts as coming from an empty list: everything missing is added
+                auto_loaded = self.settings.get("auto_load_predefined", True)
+                old_predefined = self.settings.get("predefined_tasks", []) if auto_loaded else []
+                self.settings.update(dlg.get_settings())
+                self.apply_theme(self.settings["theme"])
+                self.apply_parallel_timers()
+                if self.settings.get("auto_load_predefined", True):
+                    self.reconcile_predefined_tasks(old_predefined)
+
+    def load_predefined_tasks(self):
+        predefined = self.settings.get("predefined_tasks", [])
+        if predefined:
+            self.task_model.reset(predefined)
+            self.update_task_highlight()
+
+    def reconcile_predefined_tasks(self, old_predefined):
+        # Running timers and tracked time survive; only the difference between the lists changes
+        task = self.selected_task()
+        self.task_model.reconcile(old_predefined, self.settings.get("predefined_tasks", []))
+        self.select_task(task)
+        self.update_task_highlight()
+
+    def apply_theme(self, name):
+        # A palette change only repaints; a stylesheet would re-polish every widget
+        theme = get_theme(name)
+        if QApplication.palette() != theme.palette:
+            QApplication.setPalette(theme.palette)
+        self.task_model.set_colors(theme.running, theme.selected, theme.highlight_text)
+
+    # ----------------- Mini Mode -----------------
+    def toggle_mini_mode(self):
+        with probes.measure("toggle_mini_mode"):
+            if not self.is_mini_mode:
+                self.full_size = self.size()
+                self.pages.setCurrentWidget(self.mini_page)
+                self.setFixedSize(MINI_MODE_SIZE)
+            else:
+                self.setMinimumSize(0, 0)
+                self.setMaximumSize(QWIDGETSIZE_MAX, QWIDGETSIZE_MAX)
+                self.pages.setCurrentWidget(self.full_page)
+                self.resize(self.full_size)
+            self.is_mini_mode = not self.is_mini_mode
+            self.scheduler.invalidate()
+
+    def mouseDoubleClickEvent(self, event):
+        if self.is_mini_mode:
+            self.toggle_mini_mode()
+
+    # ----------------- Persistent settings -----------------
+    # Changes go through self.settings.update(); the store writes them in the background
+    def load_settings(self):
+        with probes.measure("load_settings"):
+            self.settings = SettingsStore()
+
+    def on_settings_changed(self, keys):
+        # Edited by another instance or by hand; predefined tasks apply on the next load
+        if "theme" in keys:
+            self.apply_theme(self.settings["theme"])
+        if "diagnostics" in keys:
+            probes.enable(self.settings["diagnostics"])
+        if "parallel_timers" in keys:
+            self.apply_parallel_timers()
+        if "columnar_archive" in keys and not self.link:
+            self.apply_archive()
+        if "export_sinks" in keys and not self.link:
+            self.apply_export_sinks()
+
+    def apply_parallel_timers(self):
+        # Switching off leaves only the current task running; with a daemon, its setting counts
+        if not self.link and self.store.parallel != self.settings.get("parallel_timers", False):
+            self.store.set_parallel(self.settings.get("parallel_timers", False))
+            self.update_task_highlight()
+
+    def apply_archive(self):
+        if self.archive:
+            self.store.observers.remove(self.archive)
+            self.archive.close()
+        self.archive = archive_writer(self.settings)
+        if self.archive:
+            self.store.observers.append(self.archive)
+
+    def apply_export_sinks(self):
+        # Undelivered records stay in the outbox of their sink and go out with the new pipeline
+        if self.sinks:
+            self.store.observers.remove(self.sinks)
+            self.sinks.close(timeout=0)
+        self.sinks = export_pipeline(self.settings)
+        if self.sinks:
+            self.store.observers.append(self.sinks)
+
+    def on_settings_failed(self, error):
+        self.show_message(QMessageBox.Warning, "Fout", f"Kon instellingen niet opslaan:\n{error}")
@@ -0,0 +1,321 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from .intervals import split_by_day
+
+log = logging.getLogger(__name__)
+
+HISTORY_FILE = "history.sqlite3"
+HISTORY_FLUSH_INTERVAL = 1.0  # seconds of closed intervals grouped into one transaction
+HISTORY_BUSY_TIMEOUT = 10.0   # seconds a write waits for another process holding the database
+HISTORY_FLUSH_TIMEOUT = 30.0  # longest a reader waits for the writer to catch up
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS intervals (
+    id INTEGER PRIMARY KEY,
+    task_id INTEGER NOT NULL REFERENCES tasks(id),
+    day TEXT NOT NULL,
+    start REAL NOT NULL,
+    stop REAL NOT NULL,
+    import_id INTEGER REFERENCES imports(id)
+);
+CREATE INDEX IF NOT EXISTS intervals_by_start ON intervals(start);
+CREATE INDEX IF NOT EXISTS intervals_by_task ON intervals(task_id, start);
+CREATE INDEX IF NOT EXISTS intervals_by_import ON intervals(import_id) WHERE import_id IS NOT NULL;
+-- Per day x task totals, kept up to date in the same transaction as the intervals,
+-- so range totals scan one row per task per day instead of every interval
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    task_id INTEGER NOT NULL REFERENCES tasks(id),
+    seconds REAL NOT NULL,
+    PRIMARY KEY (day, task_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_by_task ON daily(task_id, day, seconds);
+-- Days taken from earlier CSV exports: the export that won the day and the files already read
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL UNIQUE,
+    exported REAL NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS import_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Steps from the previous version, run before SCHEMA on an existing database
+MIGRATIONS = {
+    2: "ALTER TABLE intervals ADD COLUMN import_id INTEGER REFERENCES imports(id)",
+}
+
+
+# --------------------- Day helpers ---------------------
+def day_key(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d")
+
+
+def day_start(value, offset_days=0):
+    day = datetime.strptime(day_key(value), "%Y-%m-%d").date() + timedelta(days=offset_days)
+    return datetime.combine(day, datetime.min.time()).timestamp()
+
+
+# --------------------- History Store ---------------------
+class HistoryStore:
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self._task_ids = {}
+        self._read_lock = threading.Lock()
+
+        setup = sqlite3.connect(path)
+        setup.execute("PRAGMA journal_mode=WAL")
+        version = setup.execute("PRAGMA user_version").fetchone()[0]
+        if version:
+            for step in range(version + 1, SCHEMA_VERSION + 1):
+                setup.execute(MIGRATIONS[step])
+        setup.executescript(SCHEMA)
+        setup.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        setup.commit()
+        setup.close()
+
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # ----------------- Recording (observer hooks for TaskStore) -----------------
+    def interval_closed(self, task, start, stop):
+        self.record_interval(task.name, start, stop)
+
+    def record_interval(self, name, start, stop):
+        if stop > start:
+            try:
+                # Days are cut at local midnights, which only exist for real dates
+                datetime.fromtimestamp(start), datetime.fromtimestamp(stop)
+            except (OverflowError, OSError, ValueError):
+                log.error("Not recording %r: %r to %r is not a time range", name, start, stop)
+                return
+            self._queue.put((name, start, stop))
+
+    def flush(self, timeout=HISTORY_FLUSH_TIMEOUT):
+        # False when the writer did not get there in time; queries then miss the latest intervals
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._reader.close()
+
+    # ----------------- Queries -----------------
+    # Days are 'YYYY-MM-DD' strings, dates or timestamps; both ends are inclusive.
+    def task_total(self, name, first_day=None, last_day=None):
+        where, params = self._range("d", first_day, last_day)
+        row = self._query_one(
+            f"SELECT COALESCE(SUM(d.seconds), 0) FROM daily d "
+            f"WHERE d.task_id = (SELECT id FROM tasks WHERE name = ?){where}", (name, *params)
+        )
+        return row[0]
+
+    def totals_by_task(self, first_day=None, last_day=None):
+        where, params = self._range("d", first_day, last_day)
+        return self._query(
+            f"SELECT t.name, SUM(d.seconds) FROM daily d JOIN tasks t ON t.id = d.task_id "
+            f"WHERE 1{where} GROUP BY d.task_id ORDER BY t.name", params
+        )
+
+    def totals_by_day(self, first_day=None, last_day=None, name=None):
+        where, params = self._range("d", first_day, last_day)
+        if name is not None:
+            where += " AND d.task_id = (SELECT id FROM tasks WHERE name = ?)"
+            params += (name,)
+        return self._query(
+            f"SELECT d.day, SUM(d.seconds) FROM daily d WHERE 1{where} GROUP BY d.day ORDER BY d.day", params
+        )
+
+    def daily_totals(self, first_day=None, last_day=None):
+        where, params = self._range("d", first_day, last_day)
+        return self._query(
+            f"SELECT d.day, t.name, d.seconds FROM daily d JOIN tasks t ON t.id = d.task_id "
+            f"WHERE 1{where} ORDER BY d.day, t.name", params
+        )
+
+    def intervals(self, first_day=None, last_day=None, name=None):
+        # Stored intervals never cross midnight, so a day range is a start-time range
+        where, params = "", ()
+        if first_day is not None:
+            where += " AND i.start >= ?"
+            params += (day_start(first_day),)
+        if last_day is not None:
+            where += " AND i.start < ?"
+            params += (day_start(last_day, 1),)
+        if name is not None:
+            where += " AND i.task_id = (SELECT id FROM tasks WHERE name = ?)"
+            params += (name,)
+        return self._query(
+            f"SELECT t.name, i.start, i.stop FROM intervals i JOIN tasks t ON t.id = i.task_id "
+            f"WHERE 1{where} ORDER BY i.start", params
+        )
+
+    def _range(self, table, first_day, last_day):
+        where, params = "", ()
+        if first_day is not None:
+            where += f" AND {table}.day >= ?"
+            params += (day_key(first_day),)
+        if last_day is not None:
+            where += f" AND {table}.day <= ?"
+            params += (day_key(last_day),)
+        return where, params
+
+    def _query(self, sql, params=()):
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def _query_one(self, sql, params=()):
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchone()
+
+    # ----------------- Imports -----------------
+    def imported_files(self):
+        # path -> (size, mtime_ns) of every export file already imported
+        return {path: (size, mtime_ns) for path, size, mtime_ns
+                in self._query("SELECT path, size, mtime_ns FROM import_files")}
+
+    def import_days(self, days, files):
+        # days: {day: (exported, path, {name: seconds})}, files: [(path, size, mtime_ns)].
+        # A day is taken from the newest export that has it; days with time tracked live
+        # keep that time. Exports only hold day totals, so the imported seconds are laid
+        # out back to back from midnight. One transaction, so an interrupted import
+        # resumes at the first file that is not in import_files yet.
+        conn = sqlite3.connect(self.path, timeout=30)
+        task_ids = {}
+        applied = 0
+        try:
+            with conn:
+                for day, (exported, path, totals) in days.items():
+                    if self._import_day(conn, task_ids, day, exported, path, totals):
+                        applied += 1
+                conn.executemany(
+                    "INSERT OR REPLACE INTO import_files (path, size, mtime_ns) VALUES (?, ?, ?)", files
+                )
+        finally:
+            conn.close()
+        return applied
+
+    def _import_day(self, conn, task_ids, day, exported, path, totals):
+        start, end = day_start(day), day_start(day, 1)
+        live = conn.execute(
+            "SELECT 1 FROM intervals WHERE start >= ? AND start < ? AND import_id IS NULL LIMIT 1", (start, end)
+        ).fetchone()
+        if live:
+            return False
+        previous = conn.execute("SELECT id, exported FROM imports WHERE day = ?", (day,)).fetchone()
+        if previous:
+            if previous[1] > exported:
+                return False
+            import_id = previous[0]
+            conn.execute("DELETE FROM intervals WHERE import_id = ?", (import_id,))
+            conn.execute("DELETE FROM daily WHERE day = ?", (day,))
+            conn.execute("UPDATE imports SET exported = ?, path = ? WHERE id = ?", (exported, path, import_id))
+        else:
+            import_id = conn.execute(
+                "INSERT INTO imports (day, exported, path) VALUES (?, ?, ?)", (day, exported, path)
+            ).lastrowid
+        rows = []
+        for name, seconds in totals.items():
+            stop = min(start + seconds, end)
+            if stop > start:
+                rows.append((self._import_task_id(conn, task_ids, name), day, start, stop, import_id))
+                start = stop
+        conn.executemany(
+            "INSERT INTO intervals (task_id, day, start, stop, import_id) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.executemany(
+            "INSERT INTO daily (day, task_id, seconds) VALUES (?, ?, ?) "
+            "ON CONFLICT (day, task_id) DO UPDATE SET seconds = seconds + excluded.seconds",
+            [(day, task_id, e - s) for task_id, day, s, e, _ in rows]
+        )
+        return True
+
+    def _import_task_id(self, conn, task_ids, name):
+        # Own cache: the writer thread's one is not shared with this connection
+        task_id = task_ids.get(name)
+        if task_id is None:
+            conn.execute("INSERT OR IGNORE INTO tasks (name) VALUES (?)", (name,))
+            task_id = conn.execute("SELECT id FROM tasks WHERE name = ?", (name,)).fetchone()[0]
+            task_ids[name] = task_id
+        return task_id
+
+    # ----------------- Writer thread -----------------
+    def _run(self):
+        conn = sqlite3.connect(self.path, timeout=HISTORY_BUSY_TIMEOUT)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL
+            while isinstance(batch[-1], tuple):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            closing = batch[-1] is None
+            intervals = [item for item in batch if isinstance(item, tuple)]
+            try:
+                self._write(conn, intervals)
+            except (sqlite3.Error, TypeError, ValueError, OverflowError, OSError) as e:
+                # The batch is lost, the writer is not: later intervals still get recorded.
+                # Task ids cached during the rolled back transaction may not exist.
+                self._task_ids.clear()
+                log.error("Could not write %d interval(s) to the history: %s", len(intervals), e)
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+        conn.close()
+
+    def _write(self, conn, batch):
+        if not batch:
+            return
+        with conn:
+            rows = []
+            for name, start, stop in batch:
+                task_id = self._task_id(conn, name)
+                rows.extend((task_id, day, s, e) for day, s, e in split_by_day(start, stop))
+            conn.executemany("INSERT INTO intervals (task_id, day, start, stop) VALUES (?, ?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT INTO daily (day, task_id, seconds) VALUES (?, ?, ?) "
+                "ON CONFLICT (day, task_id) DO UPDATE SET seconds = seconds + excluded.seconds",
+                [(day, task_id, e - s) for task_id, day, s, e in rows]
+            )
+
+    def _task_id(self, conn, name):
+        task_id = self._task_ids.get(name)
+        if task_id is None:
+            conn.execute("INSERT OR IGNORE INTO tasks (name) VALUES (?)", (name,))
+            task_id = conn.execute("SELECT id FROM tasks WHERE name = ?", (name,)).fetchone()[0]
+            self._task_ids[name] = task_id
+        return task_id
@@ -0,0 +1,132 @@
+import csv
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from .diagnostics import probes
+from .export import CSV_HEADER
+
+log = logging.getLogger(__name__)
+
+IMPORT_CHUNK_FILES = 2000        # files per transaction; an interrupted import resumes at the next chunk
+IMPORT_PARALLEL_MIN_FILES = 64   # below this, starting worker processes costs more than it saves
+IMPORT_BUFFER_SIZE = 1 << 16
+
+# "<weekday>, dd.mm.yyyy_HH-MM-SS_tasks_day.csv", see export_filename
+EXPORT_NAME = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})_(\d{2})-(\d{2})-(\d{2})_tasks_day\.csv$")
+ROW_DATE = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})")
+
+
+# --------------------- Parsing ---------------------
+def export_timestamp(filename):
+    match = EXPORT_NAME.search(filename)
+    if not match:
+        return None
+    d, m, y, hh, mm, ss = map(int, match.groups())
+    try:
+        return datetime(y, m, d, hh, mm, ss).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_day(text):
+    # "Mon, 14.10.2026" -> "2026-10-14"; the weekday part depends on the locale, so only the date counts
+    match = ROW_DATE.search(text)
+    if not match:
+        return None
+    d, m, y = map(int, match.groups())
+    try:
+        return date(y, m, d).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_duration(text):
+    parts = text.split(":")
+    if len(parts) != 3:
+        return None
+    try:
+        h, m, s = map(int, parts)
+    except ValueError:
+        return None
+    return h * 3600 + m * 60 + s
+
+
+def parse_export(path):
+    # {day: {name: seconds}} of one export, read row by row. Runs in the worker processes.
+    days = {}
+    try:
+        with open(path, newline="", buffering=IMPORT_BUFFER_SIZE) as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or row[:3] == CSV_HEADER:
+                    continue
+                day, name, seconds = parse_day(row[0]), row[1], parse_duration(row[2])
+                if day and name and seconds:
+                    totals = days.setdefault(day, {})
+                    totals[name] = totals.get(name, 0) + seconds
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        log.warning("Could not read %s: %s", path, e)
+        return None
+    return days
+
+
+# --------------------- Scanning ---------------------
+def scan_exports(folder, seen=None):
+    # (path, size, mtime_ns, exported) of the exports in folder that are new or changed since `seen`
+    seen = seen or {}
+    found = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            exported = export_timestamp(entry.name)
+            if exported is None or not entry.is_file():
+                continue
+            stat = entry.stat()
+            path = os.path.abspath(entry.path)
+            if seen.get(path) != (stat.st_size, stat.st_mtime_ns):
+                found.append((path, stat.st_size, stat.st_mtime_ns, exported))
+    # Oldest first, so the newest export of a day also wins within one run
+    found.sort(key=lambda item: item[3])
+    return found
+
+
+# --------------------- Import ---------------------
+def import_exports(folder, history, workers=None, progress=None):
+    # Imports the exports in folder that were not imported yet; returns (files, days)
+    # with the number of files read and days taken into the history.
+    with probes.measure("import.scan"):
+        files = scan_exports(folder, history.imported_files())
+    if not files:
+        return 0, 0
+
+    paths = [path for path, _, _, _ in files]
+    executor = None
+    if len(files) >= IMPORT_PARALLEL_MIN_FILES and workers != 1:
+        workers = workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=workers)
+        parsed = executor.map(parse_export, paths, chunksize=max(1, min(256, len(paths) // (workers * 4))))
+    else:
+        parsed = map(parse_export, paths)
+
+    done = applied = 0
+    try:
+        winners, checked = {}, []
+        for (path, size, mtime_ns, exported), days in zip(files, parsed):
+            if days is not None:
+                for day, totals in days.items():
+                    winner = winners.get(day)
+                    if winner is None or exported >= winner[0]:
+                        winners[day] = (exported, path, totals)
+                checked.append((path, size, mtime_ns))
+            done += 1
+            if done % IMPORT_CHUNK_FILES == 0 or done == len(files):
+                with probes.measure("import.commit"):
+                    applied += history.import_days(winners, checked)
+                winners, checked = {}, []
+                if progress:
+                    progress(done, len(files))
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    return done, applied
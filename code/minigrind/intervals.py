@@ -0,0 +1,102 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+
+# --------------------- Days ---------------------
+def split_by_day(start, stop):
+    # Cut an interval at local midnights so every piece belongs to exactly one day
+    while start < stop:
+        day = datetime.fromtimestamp(start).date()
+        midnight = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+        end = min(stop, midnight)
+        yield day.isoformat(), start, end
+        start = end
+
+
+# --------------------- Interval Index ---------------------
+class IntervalIndex:
+    # Closed (start, stop, task) intervals sorted by start. reach[i] is the latest stop among
+    # the first i + 1 intervals, so a backwards scan from a point can end as soon as nothing
+    # earlier can still overlap it: queries cost O(log n + hits). Sessions mostly close in
+    # start order, so adding is an append; parallel timers and time logged afterwards land
+    # in the middle.
+    __slots__ = ("starts", "stops", "reach", "tasks")
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def clear(self):
+        self.starts = array("d")
+        self.stops = array("d")
+        self.reach = array("d")
+        self.tasks = []
+
+    def add(self, task, start, stop):
+        i = bisect_right(self.starts, start)
+        if i == len(self.starts):
+            self.starts.append(start)
+            self.stops.append(stop)
+            self.reach.append(max(self.reach[-1], stop) if self.reach else stop)
+            self.tasks.append(task)
+            return
+        self.starts.insert(i, start)
+        self.stops.insert(i, stop)
+        self.tasks.insert(i, task)
+        self.reach.insert(i, 0.0)
+        self._update_reach(i)
+
+    def replace(self, task, old_start, old_stop, start, stop):
+        # Moves one of task's intervals; False when it is not in the index
+        i = bisect_left(self.starts, old_start)
+        while i < len(self.starts) and self.starts[i] == old_start:
+            if self.tasks[i] is task and self.stops[i] == old_stop:
+                del self.starts[i], self.stops[i], self.tasks[i], self.reach[i]
+                if i < len(self.starts):
+                    self._update_reach(i)
+                self.add(task, start, stop)
+                return True
+            i += 1
+        return False
+
+    def remove_task(self, task):
+        self.remove_tasks([task])
+
+    def remove_tasks(self, tasks):
+        # One pass over the index however many tasks go
+        gone = set(map(id, tasks))
+        keep = [i for i, other in enumerate(self.tasks) if id(other) not in gone]
+        if len(keep) == len(self.tasks):
+            return
+        self.starts = array("d", [self.starts[i] for i in keep])
+        self.stops = array("d", [self.stops[i] for i in keep])
+        self.tasks = [self.tasks[i] for i in keep]
+        self.reach = array("d", accumulate(self.stops, max))
+
+    def at(self, timestamp):
+        # (task, start, stop) of the intervals running at timestamp
+        return self._scan(bisect_right(self.starts, timestamp), timestamp)
+
+    def overlapping(self, first, last):
+        # (task, start, stop) of the intervals sharing time with [first, last), in start order
+        return self._scan(bisect_left(self.starts, last), first)
+
+    def _scan(self, end, after):
+        hits = []
+        i = end - 1
+        while i >= 0 and self.reach[i] > after:
+            if self.stops[i] > after:
+                hits.append((self.tasks[i], self.starts[i], self.stops[i]))
+            i -= 1
+        hits.reverse()
+        return hits
+
+    def _update_reach(self, i):
+        reach = self.reach[i - 1] if i else float("-inf")
+        for j in range(i, len(self.stops)):
+            reach = max(reach, self.stops[j])
+            self.reach[j] = reach
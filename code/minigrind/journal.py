@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from .task import wall_clock
+
+log = logging.getLogger(__name__)
+
+JOURNAL_FILE = "journal.log"
+SNAPSHOT_FILE = "journal.snapshot.json"
+JOURNAL_FLUSH_INTERVAL = 0.5  # seconds of records grouped into one fsync
+JOURNAL_RETRY_INTERVAL = 5.0  # seconds between attempts while the disk refuses writes
+JOURNAL_FLUSH_TIMEOUT = 10.0
+SNAPSHOT_EVERY = 1000  # records between compacted snapshots
+HEADER_PREFIX = b'{"op":"journal"'  # first line of a journal started after a snapshot
+
+
+# --------------------- Journal ---------------------
+def sync_folder(path):
+    # Makes a rename into the folder of path durable; the log is only rotated after that
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JournalState:
+    # Every record carries absolute values, so applying one twice is harmless: a pause
+    # only closes a session when the task is still marked as started
+    def __init__(self, tasks=None, day=None):
+        self.tasks = tasks if tasks is not None else {}  # name -> [total_seconds, start_time, sessions]
+        self.day = day
+        for entry in self.tasks.values():
+            if len(entry) < 3:
+                # Snapshots from before sessions were journaled
+                entry.append([])
+
+    def apply(self, record):
+        op = record["op"]
+        name = record.get("task")
+        if op == "add":
+            total = record.get("total", 0)
+            self.tasks.setdefault(name, [total, None, [[record["t"] - total, record["t"]]] if total else []])
+        elif op == "start":
+            self._entry(name)[1] = record["t"]
+        elif op == "pause":
+            entry = self._entry(name)
+            if entry[1] is not None:
+                entry[2].append([entry[1], record["t"]])
+            entry[0], entry[1] = record["total"], None
+        elif op == "log":
+            entry = self._entry(name)
+            session = [record["start"], record["t"]]
+            if entry[2][-1:] != [session]:
+                entry[2].append(session)
+            entry[0] = record["total"]
+        elif op == "remove":
+            self.tasks.pop(name, None)
+        elif op == "clear":
+            self.tasks = {}
+        self.day = datetime.fromtimestamp(record["t"]).strftime("%Y-%m-%d")
+
+    def copy(self):
+        return JournalState(
+            {name: [entry[0], entry[1], [list(session) for session in entry[2]]] for name, entry in self.tasks.items()},
+            self.day
+        )
+
+    def _entry(self, name):
+        return self.tasks.setdefault(name, [0, None, []])
+
+
+class Journal:
+    # Records are appended to journal.log; every SNAPSHOT_EVERY records the state goes to a
+    # snapshot and the log starts over. Each log starts with a header naming its generation
+    # (none for the very first), the snapshot names the generation and offset it covers.
+    def __init__(self, path=JOURNAL_FILE, snapshot_path=SNAPSHOT_FILE):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self._generation = 0
+        self.error = None  # the last failed write, until a write gets through again
+        self._state, self._offset = self._replay()
+        self.state = self._state.copy()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    # ----------------- Replay -----------------
+    def _replay(self):
+        state, offset, generation = JournalState(), 0, 0
+        try:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            state = JournalState(snapshot["tasks"], snapshot["day"])
+            offset = snapshot["offset"]
+            generation = snapshot.get("generation", 0)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return state, 0
+
+        with open(self.path, "rb") as f:
+            header = f.readline()
+            if header.startswith(HEADER_PREFIX) and header.endswith(b"\n"):
+                self._generation = json.loads(header)["generation"]
+            else:
+                header = b""
+            if self._generation != generation:
+                # A log started after the snapshot was written (the process stopped before
+                # the next one): all of it is newer than the snapshot
+                offset = len(header)
+            elif size < offset:
+                # Journal was replaced behind the snapshot's back; replaying it all is safe
+                offset = len(header)
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    state.apply(json.loads(line))
+                except (ValueError, KeyError):
+                    break
+                offset += len(line)
+
+        if offset < size:
+            # Drop the torn tail left behind by a crash mid-write
+            os.truncate(self.path, offset)
+        return state, offset
+
+    # ----------------- Recording -----------------
+    def append(self, op, task=None, **fields):
+        record = {"op": op, "t": fields.pop("t", None) or wall_clock()}
+        if task is not None:
+            record["task"] = task
+        record.update(fields)
+        self._queue.put(record)
+
+    def task_added(self, task):
+        # Time logged with the task is its one session so far, ending at the record's time
+        self.append("add", task.name, total=task.total_seconds, t=task.stops[-1] if task.stops else None)
+
+    def task_removed(self, task):
+        self.append("remove", task.name)
+
+    def task_started(self, task):
+        self.append("start", task.name, t=task.start_time)
+
+    def task_paused(self, task):
+        self.append("pause", task.name, total=task.total_seconds, t=task.stops[-1])
+
+    def task_logged(self, task):
+        self.append("log", task.name, total=task.total_seconds, start=task.starts[-1], t=task.stops[-1])
+
+    def flush(self, timeout=JOURNAL_FLUSH_TIMEOUT):
+        # True when every record so far is on disk; False while writes fail
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout) and self.error is None
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    # ----------------- Writer thread -----------------
+    def _run(self):
+        since_snapshot = 0
+        closing = False
+        f = None
+        unwritten = []  # records a failed write left behind, in order
+        while not closing:
+            # While writes fail, try again now and then even if nothing new comes in
+            try:
+                batch = [self._queue.get(timeout=JOURNAL_RETRY_INTERVAL if unwritten else None)]
+            except queue.Empty:
+                batch = []
+            deadline = time.monotonic() + JOURNAL_FLUSH_INTERVAL
+            while batch and isinstance(batch[-1], dict):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            closing = None in batch
+
+            records = unwritten + [item for item in batch if isinstance(item, dict)]
+            if records:
+                try:
+                    if f is None:
+                        f = open(self.path, "ab")
+                    f.write(b"".join(json.dumps(r, separators=(",", ":")).encode() + b"\n" for r in records))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._offset = f.tell()
+                except OSError as e:
+                    f = self._abandon(f, e, len(records))
+                    unwritten = records
+                else:
+                    if self.error is not None:
+                        log.warning("Journal writes work again, %d record(s) caught up", len(records))
+                    self.error = None
+                    unwritten = []
+                    for record in records:
+                        self._state.apply(record)
+                    since_snapshot += len(records)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+            if not unwritten and (since_snapshot >= SNAPSHOT_EVERY or (closing and since_snapshot)):
+                if self._write_snapshot():
+                    f = self._rotate(f)
+                since_snapshot = 0
+        if unwritten:
+            log.error("Journal closed with %d record(s) that could not be written: %s", len(unwritten), self.error)
+        if f is not None:
+            f.close()
+
+    def _abandon(self, f, error, count):
+        # A failed write may have left part of a line behind, and replay stops at the first
+        # broken line: cut the log back to what was written whole, and reopen it next time
+        if self.error is None:
+            log.error("Could not write the journal, %d record(s) kept to retry: %s", count, error)
+        self.error = error
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+        try:
+            os.truncate(self.path, self._offset)
+        except OSError:
+            pass
+        return None
+
+    def _write_snapshot(self):
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"generation": self._generation, "offset": self._offset,
+                           "day": self._state.day, "tasks": self._state.tasks}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            sync_folder(self.snapshot_path)
+        except OSError:
+            # The journal itself is still intact; the next snapshot will catch up
+            return False
+        return True
+
+    def _rotate(self, f):
+        # Everything in the log is in the snapshot now: swap in an empty log of the next
+        # generation. A crash on either side of the replace leaves a log the snapshot
+        # either covers up to its offset or not at all, never one it covers in part.
+        generation = self._generation + 1
+        header = json.dumps({"op": "journal", "generation": generation}, separators=(",", ":")).encode() + b"\n"
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as new:
+                new.write(header)
+                new.flush()
+                os.fsync(new.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Keep appending to the old log; the snapshot still matches it
+            return f
+        if f is not None:
+            f.close()
+        self._generation = generation
+        self._offset = len(header)
+        # Opened by the next write, which also deals with it failing
+        return None
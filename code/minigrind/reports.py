@@ -0,0 +1,344 @@
+import mmap
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .archive import ARCHIVE_DIR, read_names, segment_days, segment_path
+from .constants import REPORT_KINDS, WEEKDAYS
+from .history import day_key
+from .task import format_seconds
+
+# archive.RECORD as a numpy dtype: a segment file maps straight onto an array of these
+RECORD = np.dtype([("task", "<u4"), ("start", "<f8"), ("stop", "<f8"), ("seconds", "<f8")])
+
+
+# --------------------- Archive ---------------------
+class Archive:
+    # Reads the columnar archive through memory maps: a query maps the segments of its days
+    # and works on their columns in one go, so it costs about their size whatever the number
+    # of rows. Answers the same queries as the HistoryStore, so the command line can use either.
+    def __init__(self, folder=ARCHIVE_DIR):
+        self.folder = folder
+        self.names = read_names(folder)
+
+    def segment(self, day):
+        # The day's records, mapped rather than read. mmap + frombuffer: np.memmap does the
+        # same at twice the cost per file, which adds up over years of day segments.
+        with open(segment_path(self.folder, day), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # A crash may have left half a record at the end; it is not mapped
+            count = size // RECORD.itemsize
+            if not count:
+                return np.zeros(0, dtype=RECORD)
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(buffer, dtype=RECORD, count=count)
+
+    def segments(self, first_day=None, last_day=None):
+        # (day, records) per day with records, oldest first
+        for day in segment_days(self.folder, day_key(first_day), day_key(last_day)):
+            records = self.segment(day)
+            if len(records):
+                yield day, records
+
+    def scan(self, first_day=None, last_day=None, fields=("task", "seconds")):
+        # (days, row, columns): the days with records, the index into days of every record
+        # and the requested fields of all records, end to end. Task ids named after the
+        # archive was opened are left out.
+        days, parts = [], []
+        for day, records in self.segments(first_day, last_day):
+            days.append(day)
+            parts.append(records)
+        if not parts:
+            return days, np.zeros(0, dtype=np.int64), {field: np.zeros(0, dtype=RECORD[field]) for field in fields}
+        row = np.repeat(np.arange(len(days)), [len(part) for part in parts])
+        columns = {field: np.concatenate([part[field] for part in parts]) for field in fields}
+        known = columns["task"] < len(self.names) if "task" in columns else None
+        if known is not None and not known.all():
+            row = row[known]
+            columns = {field: values[known] for field, values in columns.items()}
+        return days, row, columns
+
+    def _task_id(self, name):
+        try:
+            return self.names.index(name)
+        except ValueError:
+            return None
+
+    # ----------------- HistoryStore queries -----------------
+    def task_total(self, name, first_day=None, last_day=None):
+        task_id = self._task_id(name)
+        if task_id is None:
+            return 0
+        _, _, columns = self.scan(first_day, last_day)
+        return float(columns["seconds"][columns["task"] == task_id].sum())
+
+    def totals_by_task(self, first_day=None, last_day=None):
+        _, _, columns = self.scan(first_day, last_day)
+        total = np.bincount(columns["task"], weights=columns["seconds"], minlength=len(self.names))
+        return sorted((self.names[i], float(total[i])) for i in np.flatnonzero(total))
+
+    def totals_by_day(self, first_day=None, last_day=None, name=None):
+        days, row, columns = self.scan(first_day, last_day)
+        if name is not None:
+            mask = columns["task"] == self._task_id(name)
+            row, columns["seconds"] = row[mask], columns["seconds"][mask]
+        total = np.bincount(row, weights=columns["seconds"], minlength=len(days))
+        return [(days[i], float(total[i])) for i in np.unique(row)]
+
+    def daily_totals(self, first_day=None, last_day=None):
+        # (day, name, seconds) ordered by day and name, like the history's daily table
+        days, row, columns = self.scan(first_day, last_day)
+        width = len(self.names)
+        ranked = sorted(range(width), key=self.names.__getitem__)
+        rank = np.empty(width, dtype=np.int64)
+        rank[ranked] = np.arange(width)
+        keys, inverse = np.unique(row * width + rank[columns["task"]], return_inverse=True)
+        seconds = np.bincount(inverse.ravel(), weights=columns["seconds"])
+        return [(days[key // width], self.names[ranked[key % width]], total)
+                for key, total in zip(keys.tolist(), seconds.tolist())]
+
+    def intervals(self, first_day=None, last_day=None, name=None):
+        _, _, columns = self.scan(first_day, last_day, ("task", "start", "stop"))
+        if name is not None:
+            mask = columns["task"] == self._task_id(name)
+            columns = {field: values[mask] for field, values in columns.items()}
+        order = np.argsort(columns["start"], kind="stable")
+        return [(self.names[t], s, e) for t, s, e in zip(
+            columns["task"][order].tolist(), columns["start"][order].tolist(), columns["stop"][order].tolist())]
+
+    def at(self, timestamp):
+        # Names of the tasks that ran at timestamp; intervals never cross midnight, so only
+        # that day's segment is read
+        try:
+            records = self.segment(day_key(timestamp))
+        except FileNotFoundError:
+            return []
+        hits = records["task"][(records["start"] <= timestamp) & (records["stop"] > timestamp)]
+        return [self.names[i] for i in np.unique(hits) if i < len(self.names)]
+
+
+# --------------------- Archive + History ---------------------
+class ArchivedHistory:
+    # The archive for the sealed days, the history store for the days after them (today, and
+    # any day not rebuilt yet), behind the same queries: fast for the years, exact for today.
+    def __init__(self, archive, history, sealed):
+        self.archive = archive
+        self.history = history
+        self.sealed = sealed
+
+    def ranges(self, first_day=None, last_day=None):
+        # ((first, last) to read from the archive or None, the same for the history)
+        first_day, last_day = day_key(first_day), day_key(last_day)
+        if self.sealed is None:
+            return None, (first_day, last_day)
+        after = (date.fromisoformat(self.sealed) + timedelta(days=1)).isoformat()
+        archived = recent = None
+        if first_day is None or first_day <= self.sealed:
+            archived = (first_day, self.sealed if last_day is None else min(last_day, self.sealed))
+        if last_day is None or last_day >= after:
+            recent = (after if first_day is None else max(first_day, after), last_day)
+        return archived, recent
+
+    def _both(self, query, first_day, last_day, *args):
+        archived, recent = self.ranges(first_day, last_day)
+        return ([getattr(self.archive, query)(*archived, *args)] if archived else []) + \
+               ([getattr(self.history, query)(*recent, *args)] if recent else [])
+
+    # ----------------- HistoryStore queries -----------------
+    def task_total(self, name, first_day=None, last_day=None):
+        archived, recent = self.ranges(first_day, last_day)
+        return ((self.archive.task_total(name, *archived) if archived else 0) +
+                (self.history.task_total(name, *recent) if recent else 0))
+
+    def totals_by_task(self, first_day=None, last_day=None):
+        totals = {}
+        for rows in self._both("totals_by_task", first_day, last_day):
+            for name, seconds in rows:
+                totals[name] = totals.get(name, 0) + seconds
+        return sorted(totals.items())
+
+    def totals_by_day(self, first_day=None, last_day=None, name=None):
+        return [row for rows in self._both("totals_by_day", first_day, last_day, name) for row in rows]
+
+    def daily_totals(self, first_day=None, last_day=None):
+        return [row for rows in self._both("daily_totals", first_day, last_day) for row in rows]
+
+    def intervals(self, first_day=None, last_day=None, name=None):
+        return [row for rows in self._both("intervals", first_day, last_day, name) for row in rows]
+
+
+# --------------------- Rollup Engine ---------------------
+class RollupEngine:
+    # Seconds per day x task in one dense matrix. Row i is day ordinal first_day + i,
+    # column j is task names[j]; both axes grow by doubling so appends stay cheap.
+    def __init__(self):
+        self.first_day = None
+        self.days = 0
+        self.names = []
+        self._columns = {}
+        self._matrix = np.zeros((0, 0))
+
+    @classmethod
+    def from_history(cls, history, first_day=None, last_day=None):
+        engine = cls()
+        engine.load(history.daily_totals(first_day, last_day))
+        return engine
+
+    @classmethod
+    def from_archive(cls, archive, first_day=None, last_day=None):
+        # Same matrix as from_history, columns in the same order (first day a task has time,
+        # then name), filled with one bincount instead of a row per day and task
+        engine = cls()
+        days, row, columns = archive.scan(first_day, last_day)
+        if not days:
+            return engine
+        ordinals = np.fromiter((date.fromisoformat(d).toordinal() for d in days), dtype=np.int64, count=len(days))
+        task = columns["task"].astype(np.int64)
+        first_row = np.full(len(archive.names), len(days))
+        np.minimum.at(first_row, task, row)
+        present = np.flatnonzero(first_row < len(days))
+        rank = np.empty(len(archive.names), dtype=np.int64)
+        rank[sorted(range(len(archive.names)), key=archive.names.__getitem__)] = np.arange(len(archive.names))
+        order = present[np.lexsort((rank[present], first_row[present]))]
+        for task_id in order:
+            engine._column(archive.names[task_id])
+        position = np.empty(len(archive.names), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        engine._ensure_days(int(ordinals[0]), int(ordinals[-1]))
+        width = len(order)
+        cells = (ordinals[row] - engine.first_day) * width + position[task]
+        sums = np.bincount(cells, weights=columns["seconds"], minlength=engine.days * width)
+        engine._matrix[:engine.days, :width] += sums.reshape(engine.days, width)
+        return engine
+
+    @classmethod
+    def from_archived_history(cls, source, first_day=None, last_day=None):
+        # The archived days in one go, the rest from the history; columns keep the same order
+        archived, recent = source.ranges(first_day, last_day)
+        engine = cls.from_archive(source.archive, *archived) if archived else cls()
+        if recent:
+            engine.load(source.history.daily_totals(*recent))
+        return engine
+
+    def load(self, daily_totals):
+        rows = list(daily_totals)
+        if not rows:
+            return
+        days, names, seconds = zip(*rows)
+        ordinals = np.fromiter((date.fromisoformat(d).toordinal() for d in days), dtype=np.int64, count=len(rows))
+        columns = np.fromiter((self._column(n) for n in names), dtype=np.int64, count=len(rows))
+        self._ensure_days(int(ordinals.min()), int(ordinals.max()))
+        np.add.at(self._matrix, (ordinals - self.first_day, columns), np.asarray(seconds, dtype=float))
+
+    # ----------------- Filling -----------------
+    def _column(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = len(self.names)
+            self.names.append(name)
+            if column >= self._matrix.shape[1]:
+                self._resize(self._matrix.shape[0], max(8, 2 * self._matrix.shape[1]))
+        return column
+
+    def _ensure_days(self, first, last):
+        if self.first_day is None:
+            self.first_day = first
+        if first < self.first_day:
+            # Rare: history older than anything seen so far, shift everything down
+            shift = self.first_day - first
+            grown = np.zeros((self._matrix.shape[0] + shift, self._matrix.shape[1]))
+            grown[shift:] = self._matrix
+            self._matrix = grown
+            self.first_day = first
+            self.days += shift
+        needed = last - self.first_day + 1
+        if needed > self._matrix.shape[0]:
+            self._resize(max(needed, 2 * self._matrix.shape[0], 32), self._matrix.shape[1])
+        self.days = max(self.days, needed)
+
+    def _resize(self, rows, columns):
+        grown = np.zeros((rows, columns))
+        grown[:self._matrix.shape[0], :self._matrix.shape[1]] = self._matrix
+        self._matrix = grown
+
+    # ----------------- Views -----------------
+    def _window(self, first_day=None, last_day=None):
+        if self.first_day is None:
+            return np.zeros((0, len(self.names))), self.first_day or 0
+        lo = 0 if first_day is None else max(0, date.fromisoformat(first_day).toordinal() - self.first_day)
+        hi = self.days if last_day is None else min(self.days, date.fromisoformat(last_day).toordinal() - self.first_day + 1)
+        hi = max(hi, lo)
+        return self._matrix[lo:hi, :len(self.names)], self.first_day + lo
+
+    def daily(self, first_day=None, last_day=None):
+        values, first = self._window(first_day, last_day)
+        index = pd.date_range(date.fromordinal(max(first, 1)), periods=len(values), freq="D", name="day")
+        return pd.DataFrame(values, index=index, columns=self.names)
+
+    # ----------------- Reports -----------------
+    def totals(self, first_day=None, last_day=None):
+        values, _ = self._window(first_day, last_day)
+        active = (values > 0).sum(axis=0)
+        total = values.sum(axis=0)
+        average = np.divide(total, active, out=np.zeros_like(total), where=active > 0)
+        frame = pd.DataFrame({"total": total, "active_days": active, "average_per_active_day": average},
+                             index=pd.Index(self.names, name="task"))
+        return frame[frame["total"] > 0].sort_values("total", ascending=False)
+
+    def weekly(self, first_day=None, last_day=None):
+        frame = self.daily(first_day, last_day)
+        return frame.groupby(frame.index.to_period("W-SUN")).sum()
+
+    def monthly(self, first_day=None, last_day=None):
+        frame = self.daily(first_day, last_day)
+        return frame.groupby(frame.index.to_period("M")).sum()
+
+    def weekdays(self, first_day=None, last_day=None):
+        values, first = self._window(first_day, last_day)
+        # date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is the weekday index
+        weekday = (np.arange(first, first + len(values)) - 1) % 7
+        distribution = np.zeros((7, values.shape[1]))
+        np.add.at(distribution, weekday, values)
+        return pd.DataFrame(distribution, index=pd.Index(WEEKDAYS, name="weekday"), columns=self.names)
+
+    def streaks(self, first_day=None, last_day=None):
+        values, first = self._window(first_day, last_day)
+        active = (values > 0).astype(np.int64)
+        # The days without time up to the end of the range (today when open) count too
+        end = date.fromisoformat(last_day).toordinal() if last_day else date.today().toordinal()
+        idle = end - (first + len(active) - 1)
+        if self.first_day is not None and idle > 0:
+            active = np.vstack([active, np.zeros((idle, active.shape[1]), dtype=np.int64)])
+        # Length of the run of active days ending on each day, for every task at once
+        count = np.cumsum(active, axis=0)
+        runs = count - np.maximum.accumulate(np.where(active == 0, count, 0), axis=0)
+        longest = runs.max(axis=0) if len(runs) else np.zeros(len(self.names), dtype=np.int64)
+        # A streak is still current when its last day is the end of the range or the day
+        # before it: the last day may not be over yet
+        if len(runs) > 1:
+            current = np.where(active[-1] > 0, runs[-1], runs[-2])
+        else:
+            current = runs[-1] if len(runs) else np.zeros(len(self.names), dtype=np.int64)
+        return pd.DataFrame({"current_streak": current, "longest_streak": longest},
+                            index=pd.Index(self.names, name="task"))
+
+    def report(self, kind, first_day=None, last_day=None):
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"Unknown report '{kind}'")
+        return getattr(self, kind)(first_day, last_day)
+
+
+# --------------------- CSV summaries ---------------------
+def format_report(frame):
+    # Seconds become HH:MM:SS like the day export; counts (days, streaks) stay as they are
+    formatted = frame.copy()
+    for column in formatted.columns:
+        if formatted[column].dtype.kind == "f":
+            formatted[column] = formatted[column].astype(np.int64).map(format_seconds)
+    return formatted
+
+
+def export_report(frame, path):
+    format_report(frame).to_csv(path)
@@ -0,0 +1,49 @@
+RECENT_QUERIES = 32
+
+
+# --------------------- Name Index ---------------------
+class NameIndex:
+    # Case-insensitive substring search over task names, aligned with the store's rows
+    # so results come out as sorted row numbers without any lookups. The queries of
+    # the current bit of typing are kept as a chain ("t", "ti", "tic"): typing on only
+    # re-checks the rows the previous query matched, backspacing is a cache hit.
+    def __init__(self, names=()):
+        self._lower = [name.lower() for name in names]
+        self._recent = []
+
+    def __len__(self):
+        return len(self._lower)
+
+    def reset(self, names):
+        self._lower = [name.lower() for name in names]
+        self._recent = []
+
+    def insert(self, row, names):
+        self._lower[row:row] = [name.lower() for name in names]
+        self._recent = []
+
+    def remove(self, first, last):
+        del self._lower[first:last + 1]
+        self._recent = []
+
+    def matches(self, row, query):
+        return query.lower() in self._lower[row]
+
+    def search(self, query):
+        query = query.lower()
+        lower = self._lower
+        if not query:
+            return list(range(len(lower)))
+
+        # Drop the queries the new one no longer extends; what is left is still a chain
+        while self._recent and self._recent[-1][0] not in query:
+            self._recent.pop()
+        if self._recent and self._recent[-1][0] == query:
+            return list(self._recent[-1][1])
+        if self._recent:
+            rows = [row for row in self._recent[-1][1] if query in lower[row]]
+        else:
+            rows = [row for row, text in enumerate(lower) if query in text]
+        self._recent.append((query, rows))
+        del self._recent[:-RECENT_QUERIES]
+        return list(rows)
@@ -0,0 +1,229 @@
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from .diagnostics import probes
+
+log = logging.getLogger(__name__)
+
+SETTINGS_FILE = "settings.json"
+SETTINGS_WRITE_DELAY = 0.5  # seconds of changes coalesced into one write
+DEFAULT_SETTINGS = {
+    "export_folder": "",
+    "theme": "System",
+    "predefined_tasks": [],
+    "auto_load_predefined": True,
+    "parallel_timers": False,  # several tasks may run at once
+    "diagnostics": False,
+    "columnar_archive": False,  # also record every session in archive/, see archive.py
+    "export_sinks": [],  # e.g. {"type": "http", "url": "http://localhost:8080/intervals"}, see sinks.py
+}
+LIST_ITEM_TYPES = {"export_sinks": dict}  # lists hold strings unless listed here
+
+
+# --------------------- Validation ---------------------
+def valid_value(key, value):
+    # Known keys must look like their default; unknown keys (newer versions, scripts) pass
+    default = DEFAULT_SETTINGS.get(key)
+    if default is None:
+        return True
+    if isinstance(default, bool):
+        return isinstance(value, bool)
+    if isinstance(default, list):
+        item_type = LIST_ITEM_TYPES.get(key, str)
+        return isinstance(value, list) and all(isinstance(item, item_type) for item in value)
+    return isinstance(value, type(default))
+
+
+def validate_settings(raw, path=SETTINGS_FILE):
+    if not isinstance(raw, dict):
+        raise ValueError("expected a JSON object")
+    settings = copy.deepcopy(DEFAULT_SETTINGS)
+    for key, value in raw.items():
+        if valid_value(key, value):
+            settings[key] = value
+        else:
+            log.warning("%s: ignoring invalid value for %r: %r", path, key, value)
+    return settings
+
+
+# --------------------- Files ---------------------
+def file_signature(stat):
+    # Identifies one version of the file: a rename brings a new inode, an in-place edit a new mtime/size
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def read_settings(path=SETTINGS_FILE):
+    # (settings, signature); settings is None when the file is missing or unreadable
+    try:
+        with open(path, "rb") as f:
+            signature = file_signature(os.fstat(f.fileno()))
+            data = f.read()
+    except FileNotFoundError:
+        return None, None
+    except OSError as e:
+        log.warning("Could not read %s: %s", path, e)
+        return None, None
+    try:
+        return validate_settings(json.loads(data), path), signature
+    except ValueError as e:
+        log.warning("Ignoring %s, it is not valid settings JSON: %s", path, e)
+        return None, signature
+
+
+def load_settings(path=SETTINGS_FILE):
+    settings, _ = read_settings(path)
+    return settings if settings is not None else copy.deepcopy(DEFAULT_SETTINGS)
+
+
+def save_settings(settings, path=SETTINGS_FILE):
+    # Temp file next to the real one, renamed over it: readers see the old or the new
+    # settings, never half a file, also when the process dies mid-write. The temp name is
+    # unique per process and thread so two instances saving at once don't share it.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(settings, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+            signature = file_signature(os.fstat(f.fileno()))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return signature
+
+
+# --------------------- Settings Store ---------------------
+class SettingsStore:
+    # Validated settings kept in memory; changes apply at once and a writer thread persists
+    # them, coalesced over SETTINGS_WRITE_DELAY. reload() merges edits other instances or
+    # scripts made to the file, except for keys changed here that are still being written.
+    def __init__(self, path=SETTINGS_FILE, on_error=None):
+        self.path = path
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        values, self._signature = read_settings(path)
+        self._values = values if values is not None else copy.deepcopy(DEFAULT_SETTINGS)
+        self._dirty = set()
+        self._merged = set()  # keys the writer took over from disk, reported by the next reload()
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="settings-writer", daemon=True)
+        self._thread.start()
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def as_dict(self):
+        with self._lock:
+            return copy.deepcopy(self._values)
+
+    def update(self, changes):
+        for key, value in changes.items():
+            if not valid_value(key, value):
+                raise ValueError(f"Invalid value for setting '{key}': {value!r}")
+        with self._lock:
+            changed = {key: copy.deepcopy(value) for key, value in changes.items() if self._values.get(key) != value}
+            self._values.update(changed)
+            self._dirty.update(changed)
+        if changed:
+            self._queue.put(True)
+        return set(changed)
+
+    def reload(self):
+        # Keys whose value changed on disk. Our own writes are recognised by their
+        # signature, so they cost a stat() and are never parsed again.
+        changed = self._reload()
+        with self._lock:
+            changed |= self._merged
+            self._merged = set()
+        return changed
+
+    def _reload(self):
+        try:
+            signature = file_signature(os.stat(self.path))
+        except OSError:
+            return set()
+        if signature == self._signature:
+            return set()
+        values, signature = read_settings(self.path)
+        with self._lock:
+            self._signature = signature
+            if values is None:
+                # Half-edited by hand or broken: keep what we have until it parses again
+                return set()
+            changed = {key for key, value in values.items()
+                       if key not in self._dirty and self._values.get(key) != value}
+            for key in changed:
+                self._values[key] = values[key]
+        return changed
+
+    def flush(self):
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    # ----------------- Writer thread -----------------
+    def _run(self):
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + SETTINGS_WRITE_DELAY
+            # Keep collecting changes until the delay passes; flush/close end the wait early
+            while batch[-1] is True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            closing = None in batch
+            self._write()
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self):
+        if not self._dirty:
+            return
+        # Another instance may have saved meanwhile; take over its values for the keys we did not touch
+        merged = self._reload()
+        with self._lock:
+            self._merged |= merged
+            values = copy.deepcopy(self._values)
+            dirty, self._dirty = self._dirty, set()
+        try:
+            with probes.measure("save_settings"):
+                signature = save_settings(values, self.path)
+        except OSError as e:
+            log.warning("Could not save %s: %s", self.path, e)
+            with self._lock:
+                self._dirty |= dirty
+            if self.on_error:
+                self.on_error(e)
+            return
+        with self._lock:
+            self._signature = signature
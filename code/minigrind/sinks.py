@@ -0,0 +1,456 @@
+import asyncio
+import concurrent.futures
+import csv
+import http.client
+import io
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import zlib
+from datetime import datetime
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process at a time is assumed
+    fcntl = None
+
+from .intervals import split_by_day
+from .task import format_seconds, format_task_date
+
+log = logging.getLogger(__name__)
+
+OUTBOX_DIR = "outbox"
+PIPELINE_QUEUE_SIZE = 10000  # records between the producers and the outboxes
+SINK_BATCH_SIZE = 500        # records per delivery
+SINK_BATCH_DELAY = 0.2       # seconds new records wait for company before a delivery
+RETRY_MIN, RETRY_MAX = 0.5, 60.0
+SINK_MAX_ATTEMPTS = 20       # failed deliveries of one batch (about a quarter of an hour) before it is set aside
+OUTBOX_POLL_INTERVAL = 5.0   # seconds; picks up records other processes appended, and retries the lock
+OUTBOX_COMPACT_BYTES = 1 << 20
+CLOSE_TIMEOUT = 2.0          # seconds spent delivering on close; the rest stays in the outbox
+SINK_CSV_HEADER = ["Datum", "Taak", "Start", "Stop", "Tijd (HH:MM:SS)"]
+
+
+class SinkError(Exception):
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+def retryable(error):
+    # Connection trouble and server errors may pass; a sink that refuses the records, or
+    # records it cannot even write, will not get better by trying again
+    if isinstance(error, SinkError):
+        return error.retry
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+# --------------------- Records ---------------------
+def interval_records(name, start, stop):
+    # One record per day the interval touches. The id is stable across retries, so a sink
+    # that sees a record twice (delivered, then the process died before the ack) can skip it.
+    for day, piece_start, piece_stop in split_by_day(start, stop):
+        yield {
+            "id": f"{name}@{piece_start:.6f}",
+            "task": name,
+            "day": day,
+            "start": piece_start,
+            "stop": piece_stop,
+            "seconds": piece_stop - piece_start,
+        }
+
+
+def encode_records(records):
+    return b"".join(json.dumps(record, separators=(",", ":")).encode() + b"\n" for record in records)
+
+
+# --------------------- Sinks ---------------------
+# A sink has a name (unique per target, it names the outbox) and `async deliver(records)`,
+# which raises when the records did not arrive. Blocking I/O goes through asyncio.to_thread.
+class CsvSink:
+    def __init__(self, path):
+        self.path = path
+        self.name = sink_name("csv", path)
+
+    async def deliver(self, records):
+        await asyncio.to_thread(self._write, records)
+
+    def _write(self, records):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            writer.writerow(SINK_CSV_HEADER)
+        for record in records:
+            writer.writerow((
+                format_task_date(record["start"]), record["task"],
+                datetime.fromtimestamp(record["start"]).strftime("%H:%M:%S"),
+                datetime.fromtimestamp(record["stop"]).strftime("%H:%M:%S"),
+                format_seconds(record["seconds"]),
+            ))
+        with open(self.path, "a", newline="") as f:
+            f.write(buffer.getvalue())
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.path = path
+        self.name = sink_name("jsonl", path)
+
+    async def deliver(self, records):
+        await asyncio.to_thread(self._write, records)
+
+    def _write(self, records):
+        with open(self.path, "ab") as f:
+            f.write(encode_records(records))
+
+    def close(self):
+        pass
+
+
+class HttpSink:
+    # POSTs {"records": [...]} and expects a 2xx. One keep-alive connection, reopened after errors.
+    def __init__(self, url, headers=None, timeout=10.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"not an http(s) URL: {url!r}")
+        self.url = url
+        self.name = sink_name("http", url)
+        self._https = parts.scheme == "https"
+        self._host, self._port = parts.hostname, parts.port
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self._headers = {"Content-Type": "application/json", **(headers or {})}
+        self._timeout = timeout
+        self._conn = None
+
+    async def deliver(self, records):
+        await asyncio.to_thread(self._post, json.dumps({"records": records}).encode())
+
+    def _post(self, body):
+        if self._conn is None:
+            connection = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            self._conn = connection(self._host, self._port, timeout=self._timeout)
+        try:
+            self._conn.request("POST", self._path, body, self._headers)
+            response = self._conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if not 200 <= response.status < 300:
+            retry = response.status >= 500 or response.status in (408, 425, 429)
+            raise SinkError(f"{self.url}: HTTP {response.status} {response.reason}", retry)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+SINK_TYPES = {
+    "csv": lambda config: CsvSink(config["path"]),
+    "jsonl": lambda config: JsonLinesSink(config["path"]),
+    "http": lambda config: HttpSink(config["url"], config.get("headers"), config.get("timeout", 10.0)),
+}
+
+
+def sink_name(kind, target):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", target).strip("_")[-40:]
+    return f"{kind}-{slug}-{zlib.crc32(target.encode()):08x}"
+
+
+def make_sinks(configs):
+    sinks = []
+    for config in configs:
+        factory = SINK_TYPES.get(config.get("type"))
+        try:
+            if factory is None:
+                raise ValueError(f"unknown sink type {config.get('type')!r}")
+            sinks.append(factory(config))
+        except (KeyError, ValueError) as e:
+            log.warning("Ignoring export sink %r: %s", config, e)
+    return sinks
+
+
+# --------------------- Outbox ---------------------
+class Outbox:
+    # Append-only JSON lines plus the byte offset delivered so far. Records stay on disk until
+    # their sink took them, so outages and restarts lose nothing and keep the order. Any
+    # process may append; the one holding the lock delivers. Records the sink gave up on
+    # go to the dead letters, to be looked at (and appended again) by hand.
+    def __init__(self, folder, name):
+        self.path = os.path.join(folder, name + ".jsonl")
+        self.dead_path = os.path.join(folder, name + ".dead.jsonl")
+        self.offset_path = os.path.join(folder, name + ".offset")
+        self._lock_file = open(os.path.join(folder, name + ".lock"), "a")
+        self.owned = False
+        self.acked = self._read_offset()
+
+    def _read_offset(self):
+        try:
+            with open(self.offset_path) as f:
+                acked = int(f.read() or 0)
+        except (OSError, ValueError):
+            acked = 0
+        # Past the end: compacted by a process that died before it could write the new offset
+        return acked if acked <= self.size() else 0
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def pending(self):
+        return self.size() > self.acked
+
+    def own(self):
+        if not self.owned:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return False
+            self.owned = True
+            # The previous owner may have delivered more since we opened the outbox
+            self.acked = self._read_offset()
+        return True
+
+    def append(self, data):
+        # One locked write in append mode: appends from several processes never interleave,
+        # and never land between the owner's size check and truncate in ack()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def read(self, limit):
+        # (records, offset after them): up to limit complete lines past the acked offset
+        records, offset = [], self.acked
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n") or len(records) >= limit:
+                        break
+                    offset += len(line)
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        log.warning("Skipping a damaged record in %s", self.path)
+        except FileNotFoundError:
+            pass
+        return records, offset
+
+    def dead_letter(self, records):
+        with open(self.dead_path, "ab") as f:
+            f.write(encode_records(records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def ack(self, offset):
+        self.acked = offset
+        if offset > OUTBOX_COMPACT_BYTES:
+            self._compact()
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(self.acked))
+        os.replace(tmp_path, self.offset_path)
+
+    def _compact(self):
+        # Everything delivered: start the file over
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size == self.acked:
+                os.ftruncate(fd, 0)
+                self.acked = 0
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self._lock_file.close()
+
+
+# --------------------- Sink Worker ---------------------
+class SinkWorker:
+    def __init__(self, sink, outbox):
+        self.sink = sink
+        self.outbox = outbox
+        self.wakeup = asyncio.Event()
+        self.lock = asyncio.Lock()
+        # Checked besides cancelling: wait_for() can swallow a cancel that races the wakeup
+        self.closed = False
+
+    async def run(self):
+        while not self.closed:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), OUTBOX_POLL_INTERVAL)
+                # Let the records of one burst travel together
+                await asyncio.sleep(SINK_BATCH_DELAY)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.deliver_pending()
+
+    async def deliver_pending(self):
+        # Oldest first, one batch at a time; a failed batch is retried, so nothing behind it
+        # overtakes it. A batch the sink refuses is tried again record by record, so only the
+        # records it refuses, and a batch that failed SINK_MAX_ATTEMPTS times, go to the dead
+        # letters instead of holding up everything after them.
+        async with self.lock:
+            if not self.outbox.own():
+                return
+            backoff = RETRY_MIN
+            attempts = 0
+            one_by_one_until = 0
+            while not self.closed:
+                limit = 1 if self.outbox.acked < one_by_one_until else SINK_BATCH_SIZE
+                records, offset = self.outbox.read(limit)
+                if offset == self.outbox.acked:
+                    return
+                try:
+                    if records:
+                        await self.sink.deliver(records)
+                except Exception as e:
+                    attempts += 1
+                    if not retryable(e) and len(records) > 1:
+                        log.warning("Export to %s refused %d record(s), trying them one by one: %s",
+                                    self.sink.name, len(records), e)
+                        one_by_one_until, attempts = offset, 0
+                        continue
+                    if retryable(e) and attempts < SINK_MAX_ATTEMPTS:
+                        log.warning("Export to %s failed, retrying in %.1fs: %s", self.sink.name, backoff, e)
+                        await asyncio.sleep(backoff)
+                        backoff = min(backoff * 2, RETRY_MAX)
+                        continue
+                    try:
+                        self.outbox.dead_letter(records)
+                    except OSError as dead:
+                        log.error("Could not write %s, retrying: %s", self.outbox.dead_path, dead)
+                        await asyncio.sleep(backoff)
+                        continue
+                    log.error("Export to %s gave up on %d record(s), kept in %s: %s",
+                              self.sink.name, len(records), self.outbox.dead_path, e)
+                backoff = RETRY_MIN
+                attempts = 0
+                self.outbox.ack(offset)
+
+
+# --------------------- Export Pipeline ---------------------
+class ExportPipeline:
+    # TaskStore observer: every closed interval goes to each sink's outbox and from there,
+    # in order, to the sink. All of it runs on one asyncio thread; the producer only puts
+    # records on a bounded queue, and writes them to the outboxes itself when that is full.
+    def __init__(self, sinks, folder=OUTBOX_DIR):
+        os.makedirs(folder, exist_ok=True)
+        self.sinks = sinks
+        self._queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        # Taking records off the queue and appending them is one step, whichever thread
+        # does it, so the outboxes keep the order they were submitted in
+        self._drain_lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._outboxes = [Outbox(folder, sink.name) for sink in sinks]
+        self._workers = []
+        self._tasks = []
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), name="export-sinks", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    @classmethod
+    def from_settings(cls, settings, folder=OUTBOX_DIR):
+        # None when no sinks are configured, so the default setup starts no thread
+        sinks = make_sinks(settings.get("export_sinks") or [])
+        return cls(sinks, folder) if sinks else None
+
+    # ----------------- Producers (any thread) -----------------
+    def interval_closed(self, task, start, stop):
+        for record in interval_records(task.name, start, stop):
+            self.submit(record)
+
+    def submit(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # The loop is behind; the outbox on disk takes the overflow instead of the
+            # producer (the GUI thread, often) waiting for the loop
+            self._drain([record])
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def flush(self, timeout=None):
+        # True when every sink has all records so far
+        future = asyncio.run_coroutine_threadsafe(self._flush(), self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return False
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        delivered = self.flush(timeout)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        self._thread.join()
+        for sink, outbox in zip(self.sinks, self._outboxes):
+            sink.close()
+            outbox.close()
+        return delivered
+
+    # ----------------- Loop thread -----------------
+    def _run(self, started):
+        asyncio.set_event_loop(self._loop)
+        # Created here so their events and locks belong to this loop
+        self._workers = [SinkWorker(sink, outbox) for sink, outbox in zip(self.sinks, self._outboxes)]
+        self._tasks = [self._loop.create_task(worker.run()) for worker in self._workers]
+        self._loop.call_soon(started.set)
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _drain(self, extra=()):
+        # Any thread: the queued records, then `extra`, to every outbox
+        with self._drain_lock:
+            records = []
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records.extend(extra)
+            if not records:
+                return
+            data = encode_records(records)
+            for outbox in self._outboxes:
+                try:
+                    outbox.append(data)
+                except OSError as e:
+                    log.error("Could not write %s, %d record(s) lost for this sink: %s", outbox.path, len(records), e)
+
+    def _wake(self):
+        self._drain()
+        for worker in self._workers:
+            if worker.outbox.pending():
+                worker.wakeup.set()
+
+    async def _flush(self):
+        self._drain()
+        await asyncio.gather(*(worker.deliver_pending() for worker in self._workers))
+        return not any(worker.outbox.owned and worker.outbox.pending() for worker in self._workers)
+
+    async def _shutdown(self):
+        for worker in self._workers:
+            worker.closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop.stop()
@@ -0,0 +1,335 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from .constants import MAX_LOGGED_MINUTES
+from .intervals import IntervalIndex
+from .task import Task, resync_clock, wall_clock
+
+
+def check_logged(seconds):
+    # Time logged afterwards ends now and starts that long ago; far enough back it no
+    # longer is a date at all, and every day export after it would fail
+    if not seconds <= MAX_LOGGED_MINUTES * 60:  # NaN included
+        raise ValueError(f"at most {MAX_LOGGED_MINUTES} minutes can be logged at once")
+
+
+# --------------------- Task Store ---------------------
+class TaskStore:
+    # Observers get whichever of these hooks they define:
+    # task_added, task_removed, task_started, task_paused, task_logged (task)
+    # interval_closed (task, start, stop)
+    # batch_started, batch_finished () around a bulk operation
+    def __init__(self, journal=None, observers=(), parallel=False):
+        self.journal = journal
+        self.observers = ([journal] if journal else []) + list(observers)
+        self._tasks = []
+        self._by_name = {}
+        # name -> row; rows from _stale_from onwards are re-indexed lazily after a removal
+        self._rows = {}
+        self._stale_from = 0
+        # The running tasks in the order they were started: pausing them all never looks
+        # at the rest of the list. More than one only when parallel timers are on.
+        self.running = {}
+        self.parallel = parallel
+        self.intervals = IntervalIndex()  # closed sessions of every task in the list
+        self._batch_depth = 0
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    # ----------------- Lookups -----------------
+    @property
+    def current_task(self):
+        # The task started last of those running
+        return next(reversed(self.running.values()), None)
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def task_at(self, row):
+        if 0 <= row < len(self._tasks):
+            return self._tasks[row]
+        return None
+
+    def row_of(self, task):
+        row = self._rows.get(task.name)
+        if row is None:
+            return -1
+        if row >= self._stale_from:
+            for i in range(self._stale_from, len(self._tasks)):
+                self._rows[self._tasks[i].name] = i
+            self._stale_from = len(self._tasks)
+            row = self._rows[task.name]
+        return row
+
+    def snapshot(self):
+        # (name, seconds, a timestamp within the day) per task per day it was worked on
+        return [(task.name, seconds, when) for task in self._tasks for when, seconds in task.day_totals()]
+
+    def tasks_at(self, timestamp):
+        # Tasks that were running at timestamp, the current session included
+        tasks = [task for task, _, _ in self.intervals.at(timestamp)]
+        for task in self.running.values():
+            if task.start_time <= timestamp and task not in tasks:
+                tasks.append(task)
+        return tasks
+
+    def sessions_between(self, first, last):
+        # (task, start, stop) of the sessions overlapping [first, last), the running one up to now
+        sessions = self.intervals.overlapping(first, last)
+        now = wall_clock()
+        for task in self.running.values():
+            if task.start_time < last:
+                sessions.append((task, task.start_time, now))
+        return sessions
+
+    # ----------------- Mutations -----------------
+    def add(self, name, total_seconds=0):
+        check_logged(total_seconds)
+        if name in self._by_name:
+            return None
+        task = Task(name)
+        if total_seconds > 0:
+            # Time logged afterwards counts as a session that ended just now
+            now = wall_clock()
+            task.add_interval(now - total_seconds, now)
+            self.intervals.add(task, now - total_seconds, now)
+        self._append(task)
+        self._notify("task_added", task)
+        if total_seconds > 0:
+            self._notify("interval_closed", task, task.starts[-1], task.stops[-1])
+        return task
+
+    def remove(self, task):
+        row = self.row_of(task)
+        if row < 0:
+            return False
+        self._pause(task)
+        self.intervals.remove_task(task)
+        del self._tasks[row]
+        del self._by_name[task.name]
+        del self._rows[task.name]
+        self._stale_from = min(self._stale_from, row)
+        self._notify("task_removed", task)
+        return True
+
+    def remove_many(self, tasks, now=None):
+        # One pass over the list and the interval index instead of one per task
+        tasks = [task for task in tasks if self._by_name.get(task.name) is task]
+        if not tasks:
+            return 0
+        first = min(self.row_of(task) for task in tasks)
+        with self.batch():
+            now = now if now is not None else wall_clock()
+            for task in tasks:
+                self._pause(task, now)
+            self.intervals.remove_tasks(tasks)
+            gone = set(map(id, tasks))
+            self._tasks[first:] = [task for task in self._tasks[first:] if id(task) not in gone]
+            for task in tasks:
+                del self._by_name[task.name]
+                del self._rows[task.name]
+                self._notify("task_removed", task)
+            self._stale_from = min(self._stale_from, first)
+        return len(tasks)
+
+    def predefined_changes(self, old_names, new_names):
+        # (tasks to remove, names to add) to go from one predefined list to the next.
+        # A dropped task that already holds time stays, as an ordinary task; a predefined
+        # task removed by hand today only comes back when it is new to the list.
+        old, new = set(old_names), set(new_names)
+        remove = []
+        for name in dict.fromkeys(old_names):
+            task = self._by_name.get(name)
+            if name not in new and task and not task.running and not task.total_seconds:
+                remove.append(task)
+        add = [name for name in dict.fromkeys(new_names) if name not in old and name not in self._by_name]
+        return remove, add
+
+    def reconcile(self, old_names, new_names):
+        remove, add = self.predefined_changes(old_names, new_names)
+        self.remove_many(remove)
+        for name in add:
+            self.add(name)
+        return remove, add
+
+    def reset(self, names):
+        self.pause_many()
+        self._clear()
+        if self.journal:
+            self.journal.append("clear")
+        for name in names:
+            self.add(name)
+
+    def start(self, task, now=None):
+        # Without parallel timers the running task, if any, is the only one to pause
+        if not self.parallel:
+            for other in [other for other in self.running.values() if other is not task]:
+                self._pause(other, now)
+        if not task.running:
+            # Re-anchoring the clock would shift the sessions still running
+            task.start(now if now is not None else wall_clock() if self.running else resync_clock())
+            self._notify("task_started", task)
+        # Started (again) last, so it becomes the current task
+        self.running.pop(task.name, None)
+        self.running[task.name] = task
+
+    def start_many(self, tasks, now=None):
+        # One start time for all of them; without parallel timers only the last one keeps
+        # running. Returns the running tasks.
+        with self.batch():
+            now = now if now is not None else wall_clock() if self.running else resync_clock()
+            for task in tasks:
+                self.start(task, now)
+        return list(self.running.values())
+
+    def pause(self, now=None):
+        task = self.current_task
+        if task:
+            self._pause(task, now)
+        return task
+
+    def pause_task(self, task, now=None):
+        if not task.running:
+            return False
+        self._pause(task, now)
+        return True
+
+    def pause_many(self, tasks=None, now=None):
+        # The given tasks, or every running one; costs the number of running tasks, not the list
+        if tasks is None:
+            tasks = list(self.running.values())
+        paused = [task for task in tasks if task.running]
+        with self.batch():
+            now = now if now is not None else wall_clock()
+            for task in paused:
+                self._pause(task, now)
+        return paused
+
+    def log_time(self, tasks, seconds, now=None):
+        # Time spent without the timer: a session of `seconds` ending now on each task
+        if seconds <= 0:
+            return []
+        check_logged(seconds)
+        tasks = list(tasks)
+        with self.batch():
+            now = now if now is not None else wall_clock()
+            for task in tasks:
+                task.add_interval(now - seconds, now)
+                self.intervals.add(task, now - seconds, now)
+                self._notify("task_logged", task)
+                self._notify("interval_closed", task, now - seconds, now)
+        return tasks
+
+    def set_parallel(self, parallel):
+        # Switching parallel timers off keeps only the current task running
+        self.parallel = parallel
+        if not parallel and len(self.running) > 1:
+            current = self.current_task
+            return self.pause_many([task for task in self.running.values() if task is not current])
+        return []
+
+    def sync(self, task, total_seconds, start_time, last=None):
+        # Takes over the times another owner (the daemon) has for task: its total, the start
+        # of its running session and the bounds of its last closed one, index included
+        if last and task.stops and (task.starts[-1], task.stops[-1]) != tuple(last):
+            old = task.starts[-1], task.stops[-1]
+            task.starts[-1], task.stops[-1] = last
+            self.intervals.replace(task, *old, *last)
+        task.total_seconds, task.start_time = total_seconds, start_time
+        if start_time is None:
+            self.running.pop(task.name, None)
+        elif task.name not in self.running:
+            self.running[task.name] = task
+
+    @contextmanager
+    def batch(self):
+        # Observers may hold back their work until the bulk operation is done; nests
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self._notify("batch_started")
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._notify("batch_finished")
+
+    # ----------------- Journal -----------------
+    def restore(self):
+        state = self.journal.state if self.journal else None
+        if not state or not state.tasks:
+            return False
+        if state.day != datetime.now().strftime("%Y-%m-%d"):
+            # A new day starts from a clean slate, just like a fresh launch. Sessions left
+            # running end at the midnight after the journal's day, so the history gets them.
+            midnight = (datetime.strptime(state.day, "%Y-%m-%d") + timedelta(days=1)).timestamp()
+            self.load(state.tasks)
+            with self.batch():
+                for task in list(self.running.values()):
+                    self._pause(task, min(max(midnight, task.start_time), wall_clock()))
+            self._clear()
+            self.journal.append("clear")
+            return False
+
+        self.load(state.tasks)
+        return True
+
+    def load(self, tasks):
+        # Replaces the list with {name: [total_seconds, start_time, sessions]}, the shape the
+        # journal keeps and the daemon serves
+        self._clear()
+        sessions = []
+        for name, (total, start_time, task_sessions) in tasks.items():
+            task = Task(name)
+            for start, stop in task_sessions:
+                task.add_interval(start, stop)
+                sessions.append((start, stop, task))
+            # Older journals only kept totals; the difference stays untracked time
+            task.total_seconds = max(total, task.total_seconds)
+            if start_time is not None:
+                task.start_time = start_time
+            self._append(task)
+        # Running in start order, so the current task is the one started last
+        for task in sorted((task for task in self._tasks if task.running), key=lambda task: task.start_time):
+            self.running[task.name] = task
+        sessions.sort(key=lambda session: session[0])
+        for start, stop, task in sessions:
+            self.intervals.add(task, start, stop)
+
+    # ----------------- Internals -----------------
+    def _append(self, task):
+        row = len(self._tasks)
+        if self._stale_from == row:
+            self._stale_from += 1
+        self._tasks.append(task)
+        self._by_name[task.name] = task
+        self._rows[task.name] = row
+
+    def _clear(self):
+        self._tasks = []
+        self._by_name = {}
+        self._rows = {}
+        self._stale_from = 0
+        self.running = {}
+        self.intervals.clear()
+
+    def _pause(self, task, now=None):
+        session = task.pause(now)
+        if session:
+            self.running.pop(task.name, None)
+            self.intervals.add(task, *session)
+            self._notify("task_paused", task)
+            self._notify("interval_closed", task, *session)
+
+    def _notify(self, event, *args):
+        for observer in self.observers:
+            handler = getattr(observer, event, None)
+            if handler:
+                handler(*args)
@@ -0,0 +1,113 @@
+import time
+from array import array
+from datetime import datetime
+
+from .intervals import split_by_day
+
+CLOCK_MAX_DRIFT = 2.0  # seconds the session clock may drift from the wall clock before it re-anchors
+
+
+# --------------------- Clock ---------------------
+# Wall time read off a monotonic clock: sub-second precise and immune to clock steps while a
+# session runs. CLOCK_BOOTTIME keeps counting during suspend, which CLOCK_MONOTONIC does not.
+if hasattr(time, "CLOCK_BOOTTIME"):
+    def _monotonic():
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+else:
+    _monotonic = time.monotonic
+
+_anchor = [time.time() - _monotonic()]
+
+
+def wall_clock():
+    return _anchor[0] + _monotonic()
+
+
+def resync_clock():
+    # Follows wall clock corrections; only called while nothing runs, so a session never jumps
+    offset = time.time() - _monotonic()
+    if abs(offset - _anchor[0]) > CLOCK_MAX_DRIFT:
+        _anchor[0] = offset
+    return wall_clock()
+
+
+# --------------------- Formatting ---------------------
+def format_seconds(elapsed):
+    elapsed = int(elapsed)
+    h, m, s = elapsed // 3600, (elapsed % 3600) // 60, elapsed % 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def format_task_date(timestamp):
+    task_date = datetime.fromtimestamp(timestamp) if timestamp else datetime.now()
+    return task_date.strftime("%a, %d.%m.%Y")
+
+
+# --------------------- Task ---------------------
+class Task:
+    # total_seconds is exact (no truncation per pause); starts/stops hold the closed
+    # sessions as packed doubles, 16 bytes each. Time without sessions (restored from an
+    # older journal) only shows up in total_seconds.
+    __slots__ = ("name", "total_seconds", "start_time", "starts", "stops")
+
+    def __init__(self, name):
+        self.name = name
+        self.total_seconds = 0.0
+        self.start_time = None
+        self.starts = array("d")
+        self.stops = array("d")
+
+    @property
+    def running(self):
+        return self.start_time is not None
+
+    def start(self, now=None):
+        if self.start_time is None:
+            self.start_time = now if now is not None else wall_clock()
+
+    def pause(self, now=None):
+        # The closed session as (start, stop), or None when the task was not running
+        if self.start_time is None:
+            return None
+        start, stop = self.start_time, max(now if now is not None else wall_clock(), self.start_time)
+        self.add_interval(start, stop)
+        self.start_time = None
+        return start, stop
+
+    def add_interval(self, start, stop):
+        self.starts.append(start)
+        self.stops.append(stop)
+        self.total_seconds += stop - start
+
+    def intervals(self):
+        return list(zip(self.starts, self.stops))
+
+    def get_elapsed(self):
+        elapsed = self.total_seconds
+        if self.start_time is not None:
+            elapsed += wall_clock() - self.start_time
+        return elapsed
+
+    def day_totals(self):
+        # [(first start within the day, seconds)] per day, sessions cut at midnight;
+        # the running session counts up to now
+        days = {}
+        tracked = 0.0
+        sessions = zip(self.starts, self.stops)
+        if self.start_time is not None:
+            sessions = [*sessions, (self.start_time, wall_clock())]
+        for start, stop in sessions:
+            tracked += stop - start
+            for day, piece_start, piece_stop in split_by_day(start, stop):
+                entry = days.get(day)
+                if entry is None:
+                    days[day] = [piece_start, piece_stop - piece_start]
+                else:
+                    entry[1] += piece_stop - piece_start
+        untracked = self.get_elapsed() - tracked
+        if untracked > 1e-6 or not days:
+            days.setdefault(datetime.now().date().isoformat(), [None, 0.0])[1] += max(untracked, 0.0)
+        return [tuple(entry) for _, entry in sorted(days.items())]
+
+    def get_time_str(self):
+        return format_seconds(self.get_elapsed())